@@ -0,0 +1,4 @@
+"""
+Benchmarks for the scanner, parser and interpreter. Run
+`python -m benchmarks --help` from the repository root for usage.
+"""
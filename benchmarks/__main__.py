@@ -0,0 +1,69 @@
+import json
+import sys
+
+from plox import ENGINES, PARSERS, SCANNERS, UsageParser
+
+from .stress import DEPTHS, SHAPES, format_stress, run_stress
+from .suite import compare, format_results, run_suite
+from .workloads import WORKLOADS
+
+
+def main(args: list[str]) -> None:
+    arg_parser = UsageParser(prog="python -m benchmarks")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="time each phase on every workload")
+    run_parser.add_argument("workloads", nargs="*", metavar="workload", help=f"the workloads to run, of {', '.join(WORKLOADS)} (default: all)")
+    run_parser.add_argument("--scale", type=float, default=1.0, help="multiply every workload size by this")
+    run_parser.add_argument("--warmup", type=int, default=1, help="untimed runs before each measurement")
+    run_parser.add_argument("--repeat", type=int, default=5, help="timed runs per measurement")
+    run_parser.add_argument("--scanner", choices=SCANNERS, default="default", help="the scanning engine to time")
+    run_parser.add_argument("--parser", choices=PARSERS, default="recursive", help="the parser to time")
+    run_parser.add_argument("--engine", choices=ENGINES, default="tree", help="the execution engine to time")
+    run_parser.add_argument("--output", "-o", metavar="FILE", help="also write the results to FILE as JSON")
+
+    stress_parser = commands.add_parser("stress", help="check parsing and evaluation of extremely deep expressions")
+    stress_parser.add_argument("shapes", nargs="*", metavar="shape", help=f"the shapes to nest, of {', '.join(SHAPES)} (default: all)")
+    stress_parser.add_argument("--depth", type=int, action="append", metavar="N", help=f"nest N levels deep; may be repeated (default: {', '.join(map(str, DEPTHS))})")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two result files")
+    compare_parser.add_argument("old", help="the baseline results")
+    compare_parser.add_argument("new", help="the results to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="the slowdown, as a fraction, counted as a regression")
+
+    options = arg_parser.parse_args(args)
+
+    if options.command == "compare":
+        with open(options.old) as old, open(options.new) as new:
+            report, regressions = compare(json.load(old), json.load(new), options.threshold)
+        print(report)
+        sys.exit(1 if regressions else 0)
+
+    if options.command == "stress":
+        unknown = [shape for shape in options.shapes if shape not in SHAPES]
+        if unknown:
+            arg_parser.error(f"unknown shape {unknown[0]!r}")
+        if any(depth < 1 for depth in options.depth or []):
+            arg_parser.error("--depth must be at least 1")
+        results = run_stress(options.shapes or list(SHAPES), options.depth or DEPTHS)
+        print(format_stress(results))
+        sys.exit(0 if all(result.ok for result in results) else 1)
+
+    unknown = [workload for workload in options.workloads if workload not in WORKLOADS]
+    if unknown:
+        arg_parser.error(f"unknown workload {unknown[0]!r}")
+    if options.repeat < 1:
+        arg_parser.error("--repeat must be at least 1")
+    results = run_suite(
+        options.workloads or None, options.scale, options.warmup, options.repeat,
+        SCANNERS[options.scanner], ENGINES[options.engine], PARSERS[options.parser],
+        progress=lambda step: print(step, file=sys.stderr)
+    )
+    print(format_results(results))
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
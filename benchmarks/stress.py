@@ -0,0 +1,92 @@
+"""
+Parses and evaluates expressions nested to extreme depths with the
+iterative parser and interpreter, checking every result and measuring how
+time and peak memory grow with depth.
+"""
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from src.error import collect_errors
+from src.iterative import IterativeInterpreter, IterativeParser
+from src.scanner import Scanner
+
+# Each shape makes a source nested `depth` levels deep, and the value it
+# should print.
+Shape = Callable[[int], tuple[str, str]]
+
+
+def every_level(depth: int) -> tuple[str, str]:
+    """
+    Every kind of node, about `depth` levels deep in all: equalities and
+    negations around a comparison of nested arithmetic.
+    """
+    repeats = max(1, depth // 7)
+    source = "!(nil == " * repeats + "(1 < " + "-(2 * (3 - (4 / (5 + " * repeats + "1" + "))))" * repeats + ")" + ")" * repeats
+    return source, "True"
+
+
+SHAPES: dict[str, Shape] = {
+    "groupings": lambda depth: ("(" * depth + "1" + ")" * depth, "1"),
+    "right_chain": lambda depth: ("1 + (" * depth + "1" + ")" * depth, str(depth + 1)),
+    "negations": lambda depth: ("-" * depth + "1", "-1" if depth % 2 else "1"),
+    "nots": lambda depth: ("!" * depth + "true", "False" if depth % 2 else "True"),
+    "every_level": every_level,
+}
+
+DEPTHS = [1000, 10000, 100000]
+
+
+@dataclass
+class StressResult:
+    shape: str
+    depth: int
+    ok: bool
+    # Scanning and parsing.
+    parse_seconds: float
+    evaluate_seconds: float
+    # The most memory, in bytes, allocated at once while scanning, parsing
+    # and evaluating.
+    peak_bytes: int
+
+
+def stress(shape: str, depth: int) -> StressResult:
+    source, expected = SHAPES[shape](depth)
+
+    def run() -> tuple[Any, bool, float, float]:
+        gc.collect()
+        started = time.perf_counter()
+        with collect_errors() as errors:
+            expression = IterativeParser(Scanner(source).scan_tokens()).parse()
+        parsed = time.perf_counter()
+        value = None if errors else IterativeInterpreter().evaluate(expression)
+        return value, bool(errors), parsed - started, time.perf_counter() - parsed
+
+    value, failed, parse_seconds, evaluate_seconds = run()
+    # Tracing allocations slows everything down, so memory is measured on a
+    # second, untimed run.
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    ok = not failed and IterativeInterpreter().stringify(value) == expected
+    return StressResult(shape, depth, ok, parse_seconds, evaluate_seconds, peak)
+
+
+def run_stress(shapes: list[str], depths: list[int]) -> list[StressResult]:
+    return [stress(shape, depth) for shape in shapes for depth in depths]
+
+
+def format_stress(results: list[StressResult]) -> str:
+    lines = [f"{'shape':<14}{'depth':>9}{'parse ms':>11}{'eval ms':>11}{'peak MB':>10}{'bytes/level':>13}  result"]
+    for result in results:
+        lines.append(
+            f"{result.shape:<14}{result.depth:>9}{result.parse_seconds * 1e3:>11.1f}{result.evaluate_seconds * 1e3:>11.1f}"
+            f"{result.peak_bytes / 1e6:>10.1f}{result.peak_bytes / result.depth:>13.0f}  {'ok' if result.ok else 'WRONG'}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,240 @@
+"""
+Times the scanner, parser and interpreter separately on the generated
+workloads, and compares the results of two runs.
+"""
+import gc
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+from src import __version__
+from src.error import run_context
+from src.expr import DepthCounter, NodeCounter
+from src.interpreter import Interpreter
+from src.iterative import IterativeParser
+from src.parser import Parser
+from src.scanner import Scanner
+
+from .workloads import SIZES, WORKLOADS
+
+PHASES = ("scan", "parse", "interpret")
+
+# Growth exponents above this are reported as super-linear. Timing noise
+# alone rarely pushes a linear phase past it.
+SUPERLINEAR_EXPONENT = 1.2
+
+# The most Python frames the recursive parser, or any of the recursive
+# engines, takes for each level of a tree.
+FRAMES_PER_LEVEL = 4
+
+
+@dataclass
+class Measurement:
+    workload: str
+    size: int
+    phase: str
+    characters: int
+    tokens: int
+    nodes: int
+    # Seconds taken by each repeat, after the warmup runs.
+    times: list[float] = field(default_factory=list)
+
+    @property
+    def best(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    def summary(self) -> dict[str, Any]:
+        summary = asdict(self)
+        summary.update(
+            min=self.best,
+            median=self.median,
+            mean=statistics.fmean(self.times),
+            stdev=statistics.stdev(self.times) if len(self.times) > 1 else 0.0,
+            max=max(self.times),
+        )
+        return summary
+
+
+def time_phase(run: Callable[[], Any], warmup: int, repeat: int) -> list[float]:
+    for _ in range(warmup):
+        run()
+
+    times = []
+    for _ in range(repeat):
+        # Garbage left over from one repeat should not be collected, and
+        # charged to, the next.
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+@contextmanager
+def recursion_limit(depth: int) -> Iterator[None]:
+    """
+    Raise the recursion limit, while the block runs, enough for the
+    recursive parser and engines to handle a tree depth levels deep.
+    """
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(limit + FRAMES_PER_LEVEL * depth)
+    try:
+        yield
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def measure(workload: str, size: int, warmup: int = 1, repeat: int = 5, scanner_class: type = Scanner, interpreter_class: type = Interpreter, parser_class: type = Parser) -> list[Measurement]:
+    """
+    Time each phase on the workload at the given size. Each phase is handed
+    the output of the one before it, made ahead of time, so that only the
+    phase itself is timed.
+    """
+    source = WORKLOADS[workload](size)
+    tokens = scanner_class(source).scan_tokens()
+    # Most workloads nest as deeply as they are long, so at all but the
+    # smallest sizes the recursive parser and engines need more than the
+    # default limit of 1000 frames. The suite measures how time grows with
+    # size, not how deep they can go, so the limit is raised to fit each
+    # workload while it is measured, and restored after. The iterative
+    # parser finds the depth without recursing.
+    depth = DepthCounter().count(IterativeParser(tokens).parse())
+    with recursion_limit(depth):
+        expression = parser_class(tokens).parse()
+        interpreter = interpreter_class()
+
+        def interpret():
+            # The result is printed, which costs the same whatever the
+            # workload, so it is thrown away rather than written to the
+            # terminal.
+            with open(os.devnull, "w") as devnull, run_context(devnull):
+                interpreter.interpret(expression)
+
+        runs = {
+            "scan": lambda: scanner_class(source).scan_tokens(),
+            "parse": lambda: parser_class(tokens).parse(),
+            "interpret": interpret,
+        }
+        counts = dict(characters=len(source), tokens=len(tokens), nodes=NodeCounter().count(expression))
+        return [
+            Measurement(workload, size, phase, **counts, times=time_phase(runs[phase], warmup, repeat))
+            for phase in PHASES
+        ]
+
+
+def growth_exponent(measurements: list[Measurement]) -> float:
+    """
+    The least squares slope of log(time) against log(size): about 1 for a
+    phase that is linear in the input, about 2 for a quadratic one.
+    """
+    xs = [math.log(m.size) for m in measurements]
+    ys = [math.log(max(m.best, 1e-9)) for m in measurements]
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if spread == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+def run_suite(workloads: Optional[list[str]] = None, scale: float = 1.0, warmup: int = 1, repeat: int = 5, scanner_class: type = Scanner, interpreter_class: type = Interpreter, parser_class: type = Parser, progress: Optional[Callable[[str], None]] = None) -> dict[str, Any]:
+    """
+    Measure every workload at each of its sizes (multiplied by scale),
+    returning the results in the form written out as JSON.
+    """
+    measurements: list[Measurement] = []
+    for workload in workloads or WORKLOADS:
+        for size in SIZES[workload]:
+            size = max(1, round(size * scale))
+            if progress:
+                progress(f"{workload} @ {size}")
+            measurements += measure(workload, size, warmup, repeat, scanner_class, interpreter_class, parser_class)
+
+    scaling = []
+    for workload in workloads or WORKLOADS:
+        for phase in PHASES:
+            curve = [m for m in measurements if m.workload == workload and m.phase == phase]
+            exponent = growth_exponent(curve)
+            scaling.append({
+                "workload": workload,
+                "phase": phase,
+                "exponent": exponent,
+                "superlinear": exponent > SUPERLINEAR_EXPONENT,
+                "curve": [[m.size, m.best] for m in curve],
+            })
+
+    return {
+        "plox": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "settings": {
+            "scale": scale,
+            "warmup": warmup,
+            "repeat": repeat,
+            "scanner": scanner_class.__name__,
+            "parser": parser_class.__name__,
+            "interpreter": interpreter_class.__name__,
+        },
+        "results": [m.summary() for m in measurements],
+        "scaling": scaling,
+    }
+
+
+def format_results(results: dict[str, Any]) -> str:
+    lines = [f"{'workload':<18}{'size':>8}{'phase':>11}{'min ms':>11}{'median ms':>11}{'stdev ms':>10}{'ns/char':>9}"]
+    for result in results["results"]:
+        lines.append(
+            f"{result['workload']:<18}{result['size']:>8}{result['phase']:>11}"
+            f"{result['min'] * 1e3:>11.3f}{result['median'] * 1e3:>11.3f}{result['stdev'] * 1e3:>10.3f}"
+            f"{result['min'] * 1e9 / max(result['characters'], 1):>9.1f}"
+        )
+
+    lines.append("")
+    lines.append(f"{'workload':<18}{'phase':>11}{'exponent':>10}")
+    for curve in results["scaling"]:
+        flag = "  super-linear" if curve["superlinear"] else ""
+        lines.append(f"{curve['workload']:<18}{curve['phase']:>11}{curve['exponent']:>10.2f}{flag}")
+    return "\n".join(lines)
+
+
+def compare(old: dict[str, Any], new: dict[str, Any], threshold: float = 0.1) -> tuple[str, int]:
+    """
+    Compare the best times of every measurement the two results share,
+    returning a report and the number of regressions: measurements at
+    least `threshold` (as a fraction) slower in new than in old, whose
+    fastest new run was also slower than the slowest old one.
+    """
+    key = lambda result: (result["workload"], result["size"], result["phase"])
+    old_results = {key(result): result for result in old["results"]}
+
+    lines = [f"{'workload':<18}{'size':>8}{'phase':>11}{'old ms':>11}{'new ms':>11}{'change':>9}"]
+    regressions = 0
+    for result in new["results"]:
+        previous = old_results.get(key(result))
+        if previous is None:
+            continue
+        ratio = result["min"] / max(previous["min"], 1e-12)
+        if ratio >= 1 + threshold and result["min"] > previous["max"]:
+            verdict = "  REGRESSION"
+            regressions += 1
+        elif ratio <= 1 - threshold and result["max"] < previous["min"]:
+            verdict = "  improved"
+        else:
+            verdict = ""
+        lines.append(
+            f"{result['workload']:<18}{result['size']:>8}{result['phase']:>11}"
+            f"{previous['min'] * 1e3:>11.3f}{result['min'] * 1e3:>11.3f}{ratio - 1:>+9.1%}{verdict}"
+        )
+
+    lines.append("")
+    lines.append(f"{regressions} regression(s) of {threshold:.0%} or more.")
+    return "\n".join(lines), regressions
@@ -0,0 +1,96 @@
+"""
+Generators of synthetic Lox sources, each stressing one part of the
+pipeline. Every generator takes a size, roughly proportional to the amount
+of work the source makes, and is deterministic, so two runs of the suite
+always measure the same inputs.
+"""
+import random
+from typing import Callable
+
+Workload = Callable[[int], str]
+
+
+def flat_chain(size: int) -> str:
+    """
+    A single long chain of additions, `size` terms long.
+    """
+    return " + ".join(str(i % 100) for i in range(size))
+
+
+def nested_groupings(size: int) -> str:
+    """
+    One literal nested inside `size` parentheses.
+    """
+    return "(" * size + "1" + ")" * size
+
+
+def comments(size: int) -> str:
+    """
+    `size` short terms, each buried in line and block comments and runs of
+    whitespace, so most of the source is skipped by the scanner.
+    """
+    lines = []
+    for i in range(size):
+        lines.append(f"    // term {i} of a comment-heavy expression, padded out to look like prose")
+        lines.append(f"  /* block comment\n     spanning lines */   {i % 10}  {'+' if i < size - 1 else ''}\t")
+    return "\n".join(lines)
+
+
+def long_strings(size: int) -> str:
+    """
+    Eight string literals of `size` characters each, concatenated.
+    """
+    return " + ".join(f'"{chr(ord("a") + i) * size}"' for i in range(8))
+
+
+def numbers(size: int) -> str:
+    """
+    `size` decimal numbers of varied length under alternating + and -, so
+    the number scanner and float arithmetic dominate.
+    """
+    generator = random.Random(size)
+    terms = [f"{generator.randrange(10 ** generator.randrange(1, 9))}.{generator.randrange(10 ** 6)}" for _ in range(size)]
+    pieces = [terms[0]]
+    for i, term in enumerate(terms[1:]):
+        pieces += (" - " if i % 2 else " + ", term)
+    return "".join(pieces)
+
+
+def integers(size: int) -> str:
+    """
+    `size` small integer products and differences under +, as in counting
+    and indexing code, so integer arithmetic dominates.
+    """
+    return " + ".join(f"{i % 1000} * {i % 7 + 1} - {i % 10}" for i in range(size))
+
+
+def templating(size: int) -> str:
+    """
+    `size` list items, each a number between two tags, concatenated into
+    one long string as a templating expression builds a page, so string `+`
+    dominates.
+    """
+    return " + ".join(f'"<li>" + {i} + "</li>"' for i in range(size))
+
+
+WORKLOADS: dict[str, Workload] = {
+    "flat_chain": flat_chain,
+    "nested_groupings": nested_groupings,
+    "comments": comments,
+    "long_strings": long_strings,
+    "numbers": numbers,
+    "integers": integers,
+    "templating": templating,
+}
+
+# The sizes each workload is measured at by default, doubling each time so
+# that the scaling curve is easy to read off.
+SIZES: dict[str, list[int]] = {
+    "flat_chain": [1000, 2000, 4000, 8000, 16000],
+    "nested_groupings": [250, 500, 1000, 2000, 4000],
+    "comments": [500, 1000, 2000, 4000, 8000],
+    "long_strings": [10000, 20000, 40000, 80000, 160000],
+    "numbers": [1000, 2000, 4000, 8000, 16000],
+    "integers": [1000, 2000, 4000, 8000, 16000],
+    "templating": [500, 1000, 2000, 4000, 8000],
+}
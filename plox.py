@@ -1,36 +1,303 @@
+import asyncio
+import json
+import os
 import sys
-from src.error import error_occurred, runtime_error_occurred
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from io import StringIO
+from argparse import ArgumentParser, Namespace
+from src.error import current_context, error, error_occurred, run_context, runtime_error_occurred
 from src.interpreter import Interpreter, RuntimeException
+from src.vm import VM
+from src.closure_compiler import ClosureInterpreter
+from src.pycode import PythonInterpreter
 from src.scanner import Scanner
-from src.expr import ASTPrinter, Expr
+from src.regex_scanner import RegexScanner
+from src.stream_scanner import StreamScanner
+from src.token_buffer import BufferScanner
+from src.mapped_scanner import MappedScanner, map_file
+from src.expr import ASTPrinter, DepthCounter, Expr, NodeCounter
+from src.optimizer import Optimizer
+from src.hashcons import Interner, MemoizingInterpreter
+from src.profiler import ProfilingInterpreter
+from src.iterative import IterativeInterpreter, IterativeParser
+from src.inference import TypedInterpreter, TypeInference
+from src import cache, memprofile, metrics
+# The embedding API, re-exported so that plox.evaluate(source) works.
+from src.embed import Evaluator, evaluate
+from src.server import EvaluationServer
+from src.memprofile import MemoryProfile
+from src.metrics import RunMetrics
 from src.tokens import Token
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional, Sequence, Sized
 from src.parser import Parser
 from traceback import print_tb
 
+SCANNERS = {
+    "default": Scanner,
+    "regex": RegexScanner,
+    "compact": BufferScanner,
+}
+
+ENGINES = {
+    "tree": Interpreter,
+    "vm": VM,
+    "closure": ClosureInterpreter,
+    "python": PythonInterpreter,
+    "iterative": IterativeInterpreter,
+    "typed": TypedInterpreter,
+}
+
+PARSERS = {
+    "recursive": Parser,
+    "iterative": IterativeParser,
+}
+
+# Size, in characters, of the chunks a script is read in with --stream.
+CHUNK_SIZE = 1 << 16
+
 interpreter = Interpreter()
-def main(args: list[str]) -> None:
-    if len(args) > 1:
-        print("Usage: plox [script.lox]")
+scanner_class = Scanner
+parser_class = Parser
+stream = False
+mapped = False
+optimizer: Optional[Optimizer] = None
+show_optimizer_stats = False
+typecheck = False
+use_cache = True
+clear_cache = False
+interner: Optional[Interner] = None
+profile_path: Optional[str] = None
+# The metrics of the run in progress, while there are any metrics hooks.
+run_metrics: Optional[RunMetrics] = None
+memory_format: Optional[str] = None
+# The memory profile of the current run, with --memprofile.
+memory_profile: Optional[MemoryProfile] = None
+
+
+class UsageParser(ArgumentParser):
+    def error(self, message: str) -> None:
+        self.print_usage()
+        print(f"Error: {message}")
         sys.exit(64)
-    elif len(args) == 1:
-        run_file(args[0])
-    else:
+
+
+@dataclass
+class ScriptResult:
+    path: str
+    exit_code: int
+    output: str
+
+
+def main(args: list[str]) -> None:
+    if args[:1] == ["serve"]:
+        serve(args[1:])
+        return
+
+    arg_parser = UsageParser(prog="plox")
+    arg_parser.add_argument("scripts", nargs="*", metavar="script", help="the .lox scripts, or directories of them, to run; omit for an interactive session")
+    arg_parser.add_argument("--scanner", choices=SCANNERS, default="default", help="the scanning engine to use")
+    arg_parser.add_argument("--parser", choices=PARSERS, default="recursive", help="the parser to use")
+    arg_parser.add_argument("--engine", choices=ENGINES, default="tree", help="the execution engine to evaluate with")
+    inputs = arg_parser.add_mutually_exclusive_group()
+    inputs.add_argument("--stream", action="store_true", help="scan the script in chunks as it is parsed, instead of reading it whole")
+    inputs.add_argument("--mmap", action="store_true", help="memory-map the script and scan its bytes as it is parsed, instead of reading it whole")
+    arg_parser.add_argument("--optimize", action="store_true", help="fold constants and simplify the expression before evaluating it")
+    arg_parser.add_argument("--optimize-stats", action="store_true", help="like --optimize, also reporting how many nodes were eliminated")
+    arg_parser.add_argument("--typecheck", action="store_true", help="report operations certain to fail on their operand types before running; do not run if any are found")
+    arg_parser.add_argument("--cse", action="store_true", help="share identical subexpressions, evaluating each once (with --engine tree)")
+    arg_parser.add_argument("--no-cache", action="store_true", help=f"neither read nor write the parsed script's {cache.EXTENSION} cache")
+    arg_parser.add_argument("--clear-cache", action="store_true", help=f"delete the script's {cache.EXTENSION} cache before running it")
+    arg_parser.add_argument("--profile", action="store_true", help="time every node (with --engine tree), printing a report to stderr")
+    arg_parser.add_argument("--profile-collapsed", metavar="FILE", help="like --profile, also writing collapsed stacks for a flame graph to FILE")
+    arg_parser.add_argument("--metrics", choices=["json"], help="print each run's phase timings and sizes to stderr, as one JSON object per line")
+    arg_parser.add_argument("--memprofile", choices=["text", "json"], help="trace the memory each stage of every run allocates, printing a report or one JSON object per run to stderr")
+    arg_parser.add_argument("--jobs", "-j", type=int, metavar="N", help="run the scripts in N worker processes (default: one per CPU)")
+    options = arg_parser.parse_args(args)
+    if options.jobs is not None and options.jobs < 1:
+        arg_parser.error("--jobs must be at least 1")
+    profiling = options.profile or options.profile_collapsed is not None
+    if profiling and options.engine != "tree":
+        arg_parser.error("--profile only profiles --engine tree")
+    if profiling and (len(options.scripts) > 1 or options.jobs is not None):
+        arg_parser.error("--profile profiles a single script")
+
+    configure(options)
+
+    if not options.scripts:
         run_interpreter()
+    elif len(options.scripts) == 1 and not os.path.isdir(options.scripts[0]) and options.jobs is None:
+        run_file(options.scripts[0])
+    else:
+        sys.exit(run_batch(list(find_scripts(options.scripts)), options))
+
+
+def serve(args: list[str]) -> None:
+    arg_parser = UsageParser(prog="plox serve", description="evaluate newline-delimited JSON requests on a socket")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="the address to listen on")
+    arg_parser.add_argument("--port", type=int, default=7878, help="the TCP port to listen on")
+    arg_parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket at PATH instead of TCP")
+    arg_parser.add_argument("--workers", type=int, metavar="N", help="evaluate in N worker processes (default: one per CPU)")
+    arg_parser.add_argument("--timeout", type=float, default=10.0, metavar="SECONDS", help="answer requests that take longer with a timeout error")
+    options = arg_parser.parse_args(args)
+    if options.workers is not None and options.workers < 1:
+        arg_parser.error("--workers must be at least 1")
+
+    server = EvaluationServer(options.workers, options.timeout)
+    try:
+        asyncio.run(server.serve(options.host, options.port, options.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+def configure(options: Namespace) -> None:
+    """
+    Set this process up to run scripts as the command line options ask.
+    Pool workers call it too, as they need not inherit the parent's setup.
+    """
+    global interpreter, scanner_class, parser_class, stream, mapped, optimizer, show_optimizer_stats, typecheck, use_cache, clear_cache, interner, profile_path, memory_format
+
+    interpreter = ENGINES[options.engine]()
+    scanner_class = SCANNERS[options.scanner]
+    parser_class = PARSERS[options.parser]
+    stream = options.stream
+    mapped = options.mmap
+    if options.optimize or options.optimize_stats:
+        optimizer = Optimizer()
+    show_optimizer_stats = options.optimize_stats
+    typecheck = options.typecheck
+    use_cache = not options.no_cache
+    clear_cache = options.clear_cache
+    if options.cse:
+        interner = Interner()
+        if options.engine == "tree":
+            interpreter = MemoizingInterpreter(interner.shared)
+    # Only a profiled run pays for the profiler.
+    if options.profile or options.profile_collapsed is not None:
+        interpreter = ProfilingInterpreter()
+        profile_path = options.profile_collapsed
+    if options.metrics == "json":
+        metrics.add_hook(print_metrics_json)
+    memory_format = options.memprofile
+    if memory_format is not None:
+        memprofile.start()
+
+
+def print_metrics_json(run: RunMetrics) -> None:
+    print(json.dumps(run.to_dict()), file=sys.stderr)
+
+
+def find_scripts(paths: list[str]) -> Iterator[str]:
+    """
+    Expand directories into the .lox scripts anywhere beneath them, in
+    sorted order; other paths are kept as they are.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, subdirectories, files in os.walk(path):
+            subdirectories.sort()
+            for name in sorted(files):
+                if name.endswith(".lox"):
+                    yield os.path.join(directory, name)
+
+
+def run_batch(paths: list[str], options: Namespace) -> int:
+    """
+    Run every script in paths across a pool of worker processes, then print
+    each one's output in order, followed by a summary. Returns the exit code
+    of the first script that failed, or 0 if none did.
+    """
+    jobs = min(options.jobs or os.cpu_count() or 1, max(len(paths), 1))
+    if jobs == 1:
+        results = [run_job(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(jobs, initializer=configure, initargs=(options,)) as pool:
+            # Handing scripts out in batches keeps the pool's overhead down,
+            # while leaving enough of them to balance the load at the end.
+            results = list(pool.map(run_job, paths, chunksize=max(1, len(paths) // (jobs * 8))))
+
+    exit_code = 0
+    failures = 0
+    for result in results:
+        status = "ok" if result.exit_code == 0 else f"exit {result.exit_code}"
+        print(f"=== {result.path} [{status}]")
+        sys.stdout.write(result.output)
+        if result.exit_code != 0:
+            failures += 1
+            exit_code = exit_code or result.exit_code
+
+    print(f"=== {len(paths)} scripts, {failures} failed")
+    return exit_code
+
+
+def run_job(path: str) -> ScriptResult:
+    if interner is not None:
+        # Nothing is shared between scripts, so the table need not grow.
+        interner.clear()
+    with run_context(StringIO()) as context:
+        exit_code = run_script(path)
+    return ScriptResult(path, exit_code, context.out.getvalue())
 
 
 def run_file(path: str) -> None:
+    exit_code = run_script(path)
+    if exit_code != 0:
+        sys.exit(exit_code)
+
+
+def run_script(path: str) -> int:
+    """
+    Run the script at path under the current run context, returning the
+    status plox should exit with: 65 for a syntax error, 70 for a runtime one.
+    """
+    if clear_cache:
+        cache.clear(path)
+
     try:
-        with open(path, mode="r", encoding="utf-8") as source_file:
-            source = source_file.read()
+        source_file = open(path, mode="r", encoding="utf-8")
     except FileNotFoundError:
-        print(f"Error: desired file {path} was not found.")
-        sys.exit(1)
+        current_context().print(f"Error: desired file {path} was not found.")
+        return 1
+
+    begin_run(path)
+    with source_file:
+        if stream:
+            chunks = iter(partial(source_file.read, CHUNK_SIZE), "")
+            if run_metrics is not None:
+                chunks = run_metrics.count_characters(chunks)
+            run_tokens(StreamScanner().scan_chunks(chunks))
+        elif mapped:
+            with map_file(source_file) as source:
+                if run_metrics is not None:
+                    run_metrics.characters = len(source)
+                expression = parse_tokens(MappedScanner(source).scan())
+            execute(expression)
+        else:
+            source = source_file.read()
+            if run_metrics is not None:
+                run_metrics.characters = len(source)
+            expression = None
+            if use_cache:
+                with phase("load"):
+                    expression = cache.load(path, source)
+            if expression is None:
+                expression = parse(source)
+                # Scripts with errors are not cached, so that they are
+                # reported again on every run.
+                if use_cache and expression is not None:
+                    cache.store(path, source, expression)
+            execute(expression)
+    end_run()
 
-    run(source)
     if error_occurred():
-        sys.exit(65)
+        return 65
     if runtime_error_occurred():
-        sys.exit(70)
+        return 70
+    return 0
 
 
 def run_interpreter() -> None:
@@ -43,18 +310,120 @@ def run_interpreter() -> None:
         return
 
 def run(code: str) -> None:
-    scanner = Scanner(code)
-    tokens: list[Token] = scanner.scan_tokens()
-    parser: Parser = Parser(tokens)
-    expression: Expr = parser.parse()
+    begin_run()
+    if run_metrics is not None:
+        run_metrics.characters = len(code)
+    execute(parse(code))
+    end_run()
+
+def run_tokens(tokens: Iterable[Token]) -> None:
+    execute(parse_tokens(tokens))
+
+def begin_run(script: Optional[str] = None) -> None:
+    global run_metrics, memory_profile
+    # A memory profile reports the size of the script, so needs the metrics.
+    run_metrics = RunMetrics(script) if metrics.enabled() or memory_format is not None else None
+    memory_profile = MemoryProfile(script) if memory_format is not None else None
+
+def end_run() -> None:
+    global run_metrics, memory_profile
+    if run_metrics is None:
+        return
+
+    finished, run_metrics = run_metrics, None
+    finished.syntax_error = error_occurred()
+    finished.runtime_error = runtime_error_occurred()
+    metrics.report(finished)
+
+    if memory_profile is not None:
+        profile, memory_profile = memory_profile, None
+        profile.characters, profile.tokens, profile.nodes = finished.characters, finished.tokens, finished.nodes
+        if memory_format == "json":
+            print(json.dumps(profile.to_dict()), file=sys.stderr)
+        else:
+            profile.report(sys.stderr)
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Measure a stage of the current run into its metrics and memory profile,
+    if it has them.
+    """
+    with metrics.phase(run_metrics, name), memprofile.stage(memory_profile, name):
+        yield
+
+def parse(code: str) -> Optional[Expr]:
+    scanner = scanner_class(code)
+    with phase("scan"):
+        tokens: Sequence[Token] = scanner.scan_tokens()
+    return parse_tokens(tokens)
+
+def parse_tokens(tokens: Iterable[Token]) -> Optional[Expr]:
+    """
+    Parse tokens into an expression, or return None if any error was found.
+    """
+    if run_metrics is not None:
+        if isinstance(tokens, Sized):
+            run_metrics.tokens = len(tokens)
+        else:
+            tokens = run_metrics.count_tokens(tokens)
+
+    with phase("parse"):
+        parser: Parser = parser_class(tokens)
+        expression: Expr = parser.parse()
+        # Anything after the expression must still be scanned, as it may hold errors.
+        for _ in parser.tokens:
+            pass
 
     if error_occurred():
+        return None
+    return expression
+
+def execute(expression: Optional[Expr]) -> None:
+    if expression is None:
         return
 
+    if run_metrics is not None:
+        run_metrics.nodes = NodeCounter().count(expression)
+        run_metrics.max_depth = DepthCounter().count(expression)
+
+    if typecheck:
+        with phase("typecheck"):
+            inference = TypeInference()
+            inference.infer(expression)
+        for problem in inference.errors:
+            error(problem.token.line, f"at '{problem.token.lexeme}' {problem.message}")
+        if inference.errors:
+            return
+
+    if optimizer is not None:
+        with phase("optimize"):
+            expression = optimizer.optimize(expression)
+        if show_optimizer_stats:
+            print(optimizer.stats, file=sys.stderr)
+
+    if interner is not None:
+        with phase("intern"):
+            expression = interner.intern(expression)
+
     # ASTPrinter().print(expression)
-    interpreter.interpret(expression)
+    with phase("interpret"):
+        interpreter.interpret(expression)
+
+    if isinstance(interpreter, ProfilingInterpreter):
+        report_profile(interpreter)
+
+def report_profile(profiler: ProfilingInterpreter) -> None:
+    profiler.report(sys.stderr)
+    if profile_path is not None:
+        try:
+            with open(profile_path, "w") as collapsed:
+                profiler.write_collapsed(collapsed)
+        except OSError as e:
+            print(f"Error: could not write {profile_path}: {e.strerror}.", file=sys.stderr)
+    profiler.reset()
 
 
 
 if __name__ == "__main__":
-    main(sys.argv[1:])
\ No newline at end of file
+    main(sys.argv[1:])
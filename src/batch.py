@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .error import RuntimeException
+from .expr import Binary, Expr, Grouping, Literal, Unary, Variable, Visitor
+from .interpreter import Interpreter
+from .numeric import is_number, widen
+from .tokens import TokenType
+
+
+@dataclass
+class BatchResult:
+    """
+    The value of an expression for every row of a batch. Rows whose
+    evaluation raised have an index into errors in error_indices (and an
+    unspecified value); all others have an index of -1.
+    """
+    values: "np.ndarray"
+    error_indices: "np.ndarray"
+    errors: list[RuntimeException]
+
+    @property
+    def ok(self) -> "np.ndarray":
+        return self.error_indices == -1
+
+    def error(self, row: int) -> Optional[RuntimeException]:
+        index = self.error_indices[row]
+        return None if index == -1 else self.errors[index]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class BatchEvaluator(Visitor):
+    """
+    Evaluates one expression over many rows at once, with each variable
+    bound to a column of values. Nodes whose operands are plain numbers (or
+    booleans) are computed as whole-array NumPy operations; anything else
+    falls back to evaluating the node row by row with an Interpreter, so the
+    results, and the RuntimeExceptions raised for individual rows, are those
+    of evaluating each row separately.
+    """
+    NUMBER_OPERATIONS = {
+        TokenType.PLUS: "add",
+        TokenType.MINUS: "subtract",
+        TokenType.STAR: "multiply",
+        TokenType.GREATER: "greater",
+        TokenType.GREATER_EQUAL: "greater_equal",
+        TokenType.LESS: "less",
+        TokenType.LESS_EQUAL: "less_equal",
+        TokenType.EQUAL_EQUAL: "equal",
+        TokenType.BANG_EQUAL: "not_equal",
+    }
+
+    def __init__(self, columns: Mapping[str, Any], rows: Optional[int] = None, interpreter: Optional[Interpreter] = None) -> None:
+        if np is None:
+            raise ImportError("Batch evaluation requires NumPy to be installed.")
+
+        self.columns = {name: self.to_column(values) for name, values in columns.items()}
+        lengths = {len(column) for column in self.columns.values()}
+        if rows is not None:
+            lengths.add(rows)
+        if len(lengths) > 1:
+            raise ValueError("All columns of a batch must have the same length.")
+        self.rows = lengths.pop() if lengths else 1
+
+        self.interpreter = interpreter or Interpreter()
+        self.error_indices = np.full(self.rows, -1, dtype=np.int32)
+        self.errors: list[RuntimeException] = []
+        # Row errors are deduplicated by message and line.
+        self.error_keys: dict[tuple[str, int], int] = {}
+
+    def evaluate(self, expr: Expr) -> BatchResult:
+        values = expr.accept(self)
+        return BatchResult(values, self.error_indices, self.errors)
+
+    def to_column(self, values: Any) -> "np.ndarray":
+        if not isinstance(values, np.ndarray):
+            # NumPy would find a common type for mixed values, making 1 and
+            # true both floats, or 1 a string beside "s". Each value keeps
+            # its own type unless all of them are numbers, or all booleans.
+            values = np.asarray(values, dtype=object)
+            if all(is_number(value) or isinstance(value, (np.integer, np.floating)) for value in values.flat):
+                try:
+                    return values.astype(np.float64)
+                except OverflowError:
+                    raise ValueError("Numbers in a batch column must fit in a float.") from None
+            if all(isinstance(value, (bool, np.bool_)) for value in values.flat):
+                return values.astype(bool)
+            return values
+
+        column = values
+        if column.dtype.kind in "iuf":
+            # Lox has no integers, only floats.
+            return column.astype(np.float64, copy=False)
+        if column.dtype.kind == "b":
+            return column
+        return column.astype(object)
+
+    def visit_literal_expr(self, expr: Literal):
+        value = widen(expr.value)
+        return self.to_column(np.full(self.rows, value, dtype=self.dtype_of(value)))
+
+    def visit_variable_expr(self, expr: Variable):
+        column = self.columns.get(expr.name.lexeme)
+        if column is None:
+            return self.fallback(Variable(expr.name))
+        return column
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return expr.expression.accept(self)
+
+    def visit_unary_expr(self, expr: Unary):
+        right = expr.right.accept(self)
+        kind = right.dtype.kind
+
+        if expr.operator.token_type is TokenType.MINUS and kind == "f":
+            return np.negative(right)
+        if expr.operator.token_type is TokenType.BANG:
+            if kind == "b":
+                return np.logical_not(right)
+            if kind == "f":
+                # Every number is truthy.
+                return np.zeros(self.rows, dtype=bool)
+
+        return self.fallback(Unary(expr.operator, Literal(None)), right)
+
+    def visit_binary_expr(self, expr: Binary):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        token_type = expr.operator.token_type
+        kinds = left.dtype.kind + right.dtype.kind
+
+        if kinds == "ff":
+            # Rows which have failed hold arbitrary values, so NumPy's own
+            # warnings about them are meaningless.
+            with np.errstate(all="ignore"):
+                if token_type is TokenType.SLASH:
+                    self.record_error(right == 0, RuntimeException("Division by zero error", expr.operator))
+                    return np.divide(left, right)
+                return getattr(np, self.NUMBER_OPERATIONS[token_type])(left, right)
+        if kinds == "bb" and token_type in (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL):
+            return getattr(np, self.NUMBER_OPERATIONS[token_type])(left, right)
+
+        return self.fallback(Binary(Literal(None), expr.operator, Literal(None)), left, right)
+
+    def fallback(self, template: Expr, *operands: "np.ndarray") -> "np.ndarray":
+        """
+        Evaluate template once per row that has not failed yet, with its
+        Literal operands set to that row's values.
+        """
+        if isinstance(template, Binary):
+            slots = [template.left, template.right]
+        elif isinstance(template, Unary):
+            slots = [template.right]
+        else:
+            slots = []
+        columns = [operand.tolist() for operand in operands]
+        result = np.full(self.rows, None, dtype=object)
+        evaluate = self.interpreter.value
+
+        for row in np.flatnonzero(self.error_indices == -1).tolist():
+            for slot, column in zip(slots, columns):
+                slot.value = column[row]
+            try:
+                result[row] = evaluate(template)
+            except RuntimeException as e:
+                self.error_indices[row] = self.error_index(e)
+
+        return self.narrow(result)
+
+    def narrow(self, values: "np.ndarray") -> "np.ndarray":
+        # Give the next node a chance at the fast path again, if every row
+        # that is still alive produced a number (or a bool).
+        live = values[self.error_indices == -1]
+        for kind, dtype in ((float, np.float64), (bool, bool)):
+            if all(type(value) is kind for value in live):
+                narrowed = np.zeros(self.rows, dtype=dtype)
+                narrowed[self.error_indices == -1] = live
+                return narrowed
+        return values
+
+    def record_error(self, mask: "np.ndarray", error: RuntimeException) -> None:
+        rows = mask & (self.error_indices == -1)
+        if rows.any():
+            self.error_indices[rows] = self.error_index(error)
+
+    def error_index(self, error: RuntimeException) -> int:
+        key = (error.message, error.token.line)
+        index = self.error_keys.get(key)
+        if index is None:
+            index = self.error_keys[key] = len(self.errors)
+            self.errors.append(error)
+        return index
+
+    def dtype_of(self, value: Any) -> Any:
+        if type(value) is float:
+            return np.float64
+        if type(value) is bool:
+            return bool
+        return object
+
+
+def evaluate_batch(expr: Expr, columns: Mapping[str, Any], rows: Optional[int] = None) -> BatchResult:
+    """
+    Evaluate expr once for every row of columns, which map variable names to
+    equally long sequences (typically NumPy arrays) of their values.
+    """
+    return BatchEvaluator(columns, rows).evaluate(expr)
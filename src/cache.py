@@ -0,0 +1,158 @@
+import gc
+import marshal
+import os
+from zlib import crc32
+from hashlib import sha256
+from typing import Optional
+
+from . import __version__
+from .expr import Binary, Expr, Grouping, Literal, PostOrder, Unary, Variable, Visitor
+from .tokens import Token, TokenType
+
+MAGIC = b"PLOXC\x00"
+# Bumped whenever the layout or contents of cached trees change.
+FORMAT = 2
+EXTENSION = ".ploxc"
+
+
+class TreeEncoder(Visitor):
+    """
+    Flattens an expression tree into a post-order list of plain tuples,
+    which marshal can store without hitting its nesting limit however deep
+    the tree is. The tree is walked with an explicit stack, so encoding
+    does not hit the recursion limit either; each visit only appends the
+    node itself.
+    """
+    def encode(self, expr: Expr) -> list[tuple]:
+        self.nodes: list[tuple] = []
+        for node in PostOrder().walk(expr):
+            node.accept(self)
+        return self.nodes
+
+    def token(self, token: Token) -> tuple:
+        return (token.token_type.name, token.lexeme, token.literal, token.line)
+
+    def visit_binary_expr(self, expr: Binary):
+        self.nodes.append(("B", self.token(expr.operator)))
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.nodes.append(("G",))
+
+    def visit_literal_expr(self, expr: Literal):
+        self.nodes.append(("L", expr.value))
+
+    def visit_unary_expr(self, expr: Unary):
+        self.nodes.append(("U", self.token(expr.operator)))
+
+    def visit_variable_expr(self, expr: Variable):
+        self.nodes.append(("V", self.token(expr.name)))
+
+
+def decode(nodes: list[tuple]) -> Expr:
+    """
+    Rebuild the tree encoded by TreeEncoder, raising ValueError if nodes
+    does not describe exactly one well-formed tree.
+    """
+    stack: list[Expr] = []
+    for node in nodes:
+        kind = node[0]
+        if kind == "L":
+            if node[1] is not None and type(node[1]) not in (bool, int, float, str):
+                raise ValueError(f"Invalid literal {node[1]!r}.")
+            stack.append(Literal(node[1]))
+        elif kind == "V":
+            stack.append(Variable(decode_token(node[1])))
+        elif kind == "G":
+            stack.append(Grouping(stack.pop()))
+        elif kind == "U":
+            stack.append(Unary(decode_token(node[1]), stack.pop()))
+        elif kind == "B":
+            right = stack.pop()
+            stack.append(Binary(stack.pop(), decode_token(node[1]), right))
+        else:
+            raise ValueError(f"Unknown node kind {kind!r}.")
+
+    if len(stack) != 1:
+        raise ValueError("Cached nodes do not form a single tree.")
+    return stack[0]
+
+
+def decode_token(token: tuple) -> Token:
+    token_type, lexeme, literal, line = token
+    return Token(TokenType[token_type], lexeme, literal, line)
+
+
+def cache_path(script_path: str) -> str:
+    return os.path.splitext(script_path)[0] + EXTENSION
+
+
+def digest(source: str) -> bytes:
+    return sha256(source.encode("utf-8")).digest()
+
+
+def header(source: str) -> bytes:
+    version = f"{__version__}/{FORMAT}".encode("ascii")
+    return MAGIC + bytes([len(version)]) + version + digest(source)
+
+
+def load(script_path: str, source: str) -> Optional[Expr]:
+    """
+    Return the tree cached for source, or None if there is no cache for it,
+    or it was made from a different source or by a different version, or it
+    cannot be read back for any other reason.
+    """
+    try:
+        with open(cache_path(script_path), "rb") as cache_file:
+            data = cache_file.read()
+    except OSError:
+        return None
+
+    expected = header(source)
+    if not data.startswith(expected):
+        return None
+
+    # The payload is followed by its checksum, to catch a damaged file.
+    payload, checksum = data[len(expected):-4], data[-4:]
+    if len(data) < len(expected) + 4 or crc32(payload).to_bytes(4, "big") != checksum:
+        return None
+
+    # Nothing freed while decoding can be garbage, but the collector would
+    # otherwise keep rescanning the growing tree, which dominates the load.
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        return decode(marshal.loads(payload))
+    except (ValueError, EOFError, TypeError, KeyError, IndexError):
+        return None
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def store(script_path: str, source: str, expr: Expr) -> None:
+    """
+    Cache the tree parsed from source. Failing to write the cache is not an
+    error; the script will just be parsed again next time.
+    """
+    path = cache_path(script_path)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        payload = marshal.dumps(TreeEncoder().encode(expr))
+        data = header(source) + payload + crc32(payload).to_bytes(4, "big")
+        with open(temporary, "wb") as cache_file:
+            cache_file.write(data)
+        # Replaced in one step, so a concurrent run never reads half a file.
+        os.replace(temporary, path)
+    except (OSError, ValueError):
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def clear(script_path: str) -> bool:
+    try:
+        os.remove(cache_path(script_path))
+        return True
+    except FileNotFoundError:
+        return False
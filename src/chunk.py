@@ -0,0 +1,86 @@
+from array import array
+from enum import IntEnum, auto
+from typing import Any
+from .tokens import Token
+
+
+class OpCode(IntEnum):
+    CONSTANT = 0
+    # Like CONSTANT, but with a three byte operand, for chunks with more than
+    # 256 constants.
+    CONSTANT_LONG = auto()
+    NIL = auto()
+    TRUE = auto()
+    FALSE = auto()
+    # Pushes the value of the variable named by a constant Token.
+    GET_VARIABLE = auto()
+    GET_VARIABLE_LONG = auto()
+
+    EQUAL = auto()
+    NOT_EQUAL = auto()
+    GREATER = auto()
+    GREATER_EQUAL = auto()
+    LESS = auto()
+    LESS_EQUAL = auto()
+
+    ADD = auto()
+    SUBTRACT = auto()
+    MULTIPLY = auto()
+    DIVIDE = auto()
+    NOT = auto()
+    NEGATE = auto()
+
+    RETURN = auto()
+
+
+class Chunk:
+    """
+    A sequence of bytecode, along with the constants it refers to and, for
+    every byte, the source line it was compiled from.
+    """
+    def __init__(self) -> None:
+        self.code = array("B")
+        self.lines = array("i")
+        self.constants: list[Any] = []
+
+    def write(self, byte: int, line: int) -> None:
+        self.code.append(byte)
+        self.lines.append(line)
+
+    def add_constant(self, value: Any) -> int:
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def write_constant(self, value: Any, line: int) -> None:
+        self.write_indexed(OpCode.CONSTANT, OpCode.CONSTANT_LONG, self.add_constant(value), line)
+
+    def write_variable(self, name: Token) -> None:
+        self.write_indexed(OpCode.GET_VARIABLE, OpCode.GET_VARIABLE_LONG, self.add_constant(name), name.line)
+
+    def write_indexed(self, short: OpCode, long: OpCode, index: int, line: int) -> None:
+        if index < 256:
+            self.write(short, line)
+            self.write(index, line)
+        else:
+            self.write(long, line)
+            for shift in (16, 8, 0):
+                self.write((index >> shift) & 0xFF, line)
+
+    def disassemble(self, name: str) -> str:
+        lines = [f"== {name} =="]
+        offset = 0
+        while offset < len(self.code):
+            instruction = OpCode(self.code[offset])
+            prefix = f"{offset:04} {self.lines[offset]:4} {instruction.name}"
+            if instruction in (OpCode.CONSTANT, OpCode.GET_VARIABLE):
+                index = self.code[offset + 1]
+                lines.append(f"{prefix} {index} {self.constants[index]!r}")
+                offset += 2
+            elif instruction in (OpCode.CONSTANT_LONG, OpCode.GET_VARIABLE_LONG):
+                index = (self.code[offset + 1] << 16) | (self.code[offset + 2] << 8) | self.code[offset + 3]
+                lines.append(f"{prefix} {index} {self.constants[index]!r}")
+                offset += 4
+            else:
+                lines.append(prefix)
+                offset += 1
+        return "\n".join(lines)
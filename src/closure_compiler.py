@@ -0,0 +1,176 @@
+import operator as op
+from typing import Any, Callable, Optional
+
+from .error import RuntimeException
+from .expr import Binary, Expr, Grouping, Literal, Unary, Variable, Visitor
+from .interpreter import Interpreter
+from .iterative import IterativeInterpreter
+from .numeric import widen
+from .tokens import Token, TokenType
+
+Closure = Callable[[], Any]
+
+
+class ClosureCompiler(Visitor):
+    """
+    Compiles an expression tree into nested Python closures. All decisions
+    that depend only on the tree, such as which operator a node applies, are
+    made once here, so calling the result does nothing but the arithmetic
+    and the type checks Lox requires.
+    """
+    COMPARISONS = {
+        TokenType.GREATER: op.gt,
+        TokenType.GREATER_EQUAL: op.ge,
+        TokenType.LESS: op.lt,
+        TokenType.LESS_EQUAL: op.le,
+    }
+
+    ARITHMETIC = {
+        TokenType.MINUS: op.sub,
+        TokenType.STAR: op.mul,
+    }
+
+    def __init__(self, interpreter: Optional[Interpreter] = None) -> None:
+        # Values print, concatenate and are looked up exactly as they are in
+        # the interpreter being sped up; variables are read from its
+        # environment each time a closure is called.
+        interpreter = interpreter or Interpreter()
+        self.stringify = interpreter.stringify
+        self.look_up = interpreter.look_up
+        self.environment = interpreter.environment
+
+    def compile(self, expr: Expr) -> Closure:
+        return expr.accept(self)
+
+    def visit_literal_expr(self, expr: Literal) -> Closure:
+        # The closures only know float numbers.
+        value = widen(expr.value)
+        return lambda: value
+
+    def visit_variable_expr(self, expr: Variable) -> Closure:
+        environment = self.environment
+        look_up = self.look_up
+        name = expr.name
+        lexeme = name.lexeme
+
+        def variable():
+            if lexeme in environment:
+                return environment[lexeme]
+            return look_up(name)
+        return variable
+
+    def visit_grouping_expr(self, expr: Grouping) -> Closure:
+        return expr.expression.accept(self)
+
+    def visit_unary_expr(self, expr: Unary) -> Closure:
+        right = expr.right.accept(self)
+        operator = expr.operator
+
+        if operator.token_type is TokenType.MINUS:
+            def negate():
+                value = right()
+                if type(value) is not float:
+                    raise RuntimeException("Operand must be a number.", operator)
+                return -value
+            return negate
+
+        def bang():
+            value = right()
+            return value is None or value is False
+        return bang
+
+    def visit_binary_expr(self, expr: Binary) -> Closure:
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        operator = expr.operator
+        token_type = operator.token_type
+
+        if token_type is TokenType.PLUS:
+            return self.add(left, right, operator)
+        if token_type in self.ARITHMETIC:
+            return self.arithmetic(left, right, operator, self.ARITHMETIC[token_type])
+        if token_type is TokenType.SLASH:
+            return self.divide(left, right, operator)
+        if token_type in self.COMPARISONS:
+            return self.comparison(left, right, operator, self.COMPARISONS[token_type])
+        if token_type is TokenType.EQUAL_EQUAL:
+            return self.equality(left, right, False)
+        if token_type is TokenType.BANG_EQUAL:
+            return self.equality(left, right, True)
+
+        return lambda: None
+
+    def add(self, left: Closure, right: Closure, operator: Token) -> Closure:
+        stringify = self.stringify
+
+        def add():
+            a = left()
+            b = right()
+            if type(a) is float and type(b) is float:
+                return a + b
+            if type(a) in (float, str) and type(b) in (float, str):
+                return stringify(a) + stringify(b)
+            raise RuntimeException("Operators must both be floats or strings.", operator)
+        return add
+
+    def arithmetic(self, left: Closure, right: Closure, operator: Token, operation: Callable[[Any, Any], Any]) -> Closure:
+        def arithmetic():
+            a = left()
+            b = right()
+            if type(a) is not float or type(b) is not float:
+                raise RuntimeException("Operands must be numbers.", operator)
+            return operation(a, b)
+        return arithmetic
+
+    def divide(self, left: Closure, right: Closure, operator: Token) -> Closure:
+        def divide():
+            a = left()
+            b = right()
+            if type(a) is not float or type(b) is not float:
+                raise RuntimeException("Operands must be numbers.", operator)
+            if b == 0:
+                raise RuntimeException("Division by zero error", operator)
+            return a / b
+        return divide
+
+    def comparison(self, left: Closure, right: Closure, operator: Token, operation: Callable[[Any, Any], bool]) -> Closure:
+        def compare():
+            a = left()
+            b = right()
+            if type(a) is str or type(b) is str:
+                return operation(str(a), str(b))
+            if type(a) is float and type(b) is float:
+                return operation(a, b)
+            raise RuntimeException(f"Comparison {operator.lexeme} of {a} of type {type(a)} is not possible with {b} of type {type(b)}.", operator)
+        return compare
+
+    def equality(self, left: Closure, right: Closure, negate: bool) -> Closure:
+        def equal():
+            a = left()
+            b = right()
+            if type(a) is str or type(b) is str:
+                a, b = str(a), str(b)
+            return (b is None if a is None else a == b) is not negate
+        return equal
+
+
+def compile(expr: Expr, interpreter: Optional[Interpreter] = None) -> Closure:
+    """
+    Compile expr into a closure which evaluates it when called. The closure
+    holds no state between calls, so it may be kept and called repeatedly.
+    """
+    return ClosureCompiler(interpreter).compile(expr)
+
+
+class ClosureInterpreter(Interpreter):
+    """
+    An Interpreter which evaluates expressions by compiling them to closures.
+    """
+    def evaluate(self, expr: Expr) -> Any:
+        try:
+            return compile(expr, self)()
+        except RecursionError:
+            # Closures nest as deeply as the tree, and both compiling and
+            # calling them recurse through it; very deep trees are walked
+            # with an explicit stack instead.
+            return IterativeInterpreter(self.environment).value(expr)
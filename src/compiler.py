@@ -0,0 +1,76 @@
+from typing import Union
+
+from .chunk import Chunk, OpCode
+from .expr import Binary, Expr, Grouping, Literal, Unary, Variable, Visitor
+from .numeric import widen
+from .tokens import TokenType
+
+
+class Compiler(Visitor):
+    """
+    Compiles an expression tree into a Chunk of stack-machine bytecode,
+    which the VM can then execute without walking the tree.
+    """
+    BINARY_OPCODES = {
+        TokenType.PLUS: OpCode.ADD,
+        TokenType.MINUS: OpCode.SUBTRACT,
+        TokenType.STAR: OpCode.MULTIPLY,
+        TokenType.SLASH: OpCode.DIVIDE,
+        TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+        TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+        TokenType.GREATER: OpCode.GREATER,
+        TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+        TokenType.LESS: OpCode.LESS,
+        TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    }
+
+    UNARY_OPCODES = {
+        TokenType.MINUS: OpCode.NEGATE,
+        TokenType.BANG: OpCode.NOT,
+    }
+
+    def __init__(self) -> None:
+        self.chunk = Chunk()
+        # Literals carry no token, so they are attributed to the line of the
+        # closest operator seen so far.
+        self.line = 1
+
+    def compile(self, expr: Expr) -> Chunk:
+        # Long chains of operators make deep trees, so rather than recursing,
+        # each node pushes its operands, and then the instruction to follow
+        # them, onto a stack of work still to do.
+        self.pending: list[Union[Expr, tuple[OpCode, int]]] = [expr]
+        while self.pending:
+            item = self.pending.pop()
+            if type(item) is tuple:
+                self.chunk.write(*item)
+            else:
+                item.accept(self)
+        self.chunk.write(OpCode.RETURN, self.line)
+        return self.chunk
+
+    def visit_binary_expr(self, expr: Binary):
+        self.line = expr.operator.line
+        self.pending += ((self.BINARY_OPCODES[expr.operator.token_type], expr.operator.line), expr.right, expr.left)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.pending.append(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        if expr.value is None:
+            self.chunk.write(OpCode.NIL, self.line)
+        elif expr.value is True:
+            self.chunk.write(OpCode.TRUE, self.line)
+        elif expr.value is False:
+            self.chunk.write(OpCode.FALSE, self.line)
+        else:
+            # The VM only knows float numbers.
+            self.chunk.write_constant(widen(expr.value), self.line)
+
+    def visit_variable_expr(self, expr: Variable):
+        self.line = expr.name.line
+        self.chunk.write_variable(expr.name)
+
+    def visit_unary_expr(self, expr: Unary):
+        self.line = expr.operator.line
+        self.pending += ((self.UNARY_OPCODES[expr.operator.token_type], expr.operator.line), expr.right)
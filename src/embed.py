@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Mapping, Optional, Union
+
+from .closure_compiler import Closure, ClosureCompiler
+from .error import LoxSyntaxError, collect_errors
+from .interpreter import Interpreter
+from .iterative import IterativeInterpreter, IterativeParser
+from .numeric import widen
+from .parser import Parser
+from .regex_scanner import RegexScanner
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+    max_size: int = 0
+
+
+class LRUCache:
+    """
+    A mapping of bounded size, which evicts its least recently used entry
+    whenever a new one would take it over max_size.
+    """
+    def __init__(self, max_size: int) -> None:
+        if max_size < 0:
+            raise ValueError("max_size cannot be negative.")
+        self.entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self.stats = CacheStats(max_size=max_size)
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the entry for key, creating it with compute() if there is none.
+        """
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+        value = compute()
+        if self.stats.max_size == 0:
+            return value
+
+        self.entries[key] = value
+        if len(self.entries) > self.stats.max_size:
+            self.entries.popitem(last=False)
+            self.stats.evictions += 1
+        self.stats.size = len(self.entries)
+        return value
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.stats.size = 0
+
+
+class Evaluator:
+    """
+    Evaluates Lox expressions for an embedding program, returning their values
+    rather than printing them. Sources are compiled once and kept in an LRU
+    cache, so evaluating a source seen recently skips scanning, parsing and
+    compiling entirely.
+
+    Scan and parse errors are raised as LoxSyntaxError (and cached like any
+    other result); runtime errors as RuntimeException. An Evaluator keeps one
+    environment for its compiled expressions, so it must not be shared
+    between threads.
+    """
+    def __init__(self, cache_size: int = 1024) -> None:
+        self.cache = LRUCache(cache_size)
+        self.interpreter = Interpreter()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.cache.stats
+
+    def compile(self, source: str) -> Closure:
+        entry = self.cache.get(source, lambda: self.compile_uncached(source))
+        if isinstance(entry, list):
+            # The errors are cached rather than the exception, as raising the
+            # same exception again would add to its traceback every time.
+            raise LoxSyntaxError(list(entry))
+        return entry
+
+    def compile_uncached(self, source: str) -> Union[Closure, list[tuple[int, str]]]:
+        """
+        Compile source, or return its scan and parse errors if it has any.
+        """
+        tokens = RegexScanner(source).scan_tokens()
+        try:
+            with collect_errors() as errors:
+                expression = Parser(tokens).parse()
+            if errors:
+                return errors
+            return ClosureCompiler(self.interpreter).compile(expression)
+        except RecursionError:
+            pass
+
+        # The source nests too deeply to parse or compile recursively, so it
+        # is parsed and evaluated with explicit stacks instead.
+        with collect_errors() as errors:
+            expression = IterativeParser(tokens).parse()
+        if errors:
+            return errors
+        interpreter = IterativeInterpreter(self.interpreter.environment)
+        # Numbers are returned as floats, as the closures return them.
+        return lambda: widen(interpreter.value(expression))
+
+    def evaluate(self, source: str, variables: Optional[Mapping[str, Any]] = None) -> Any:
+        """
+        Evaluate the expression in source, with identifiers bound to the
+        values in variables, and return its value.
+        """
+        closure = self.compile(source)
+        environment = self.interpreter.environment
+        environment.clear()
+        if variables:
+            for name, value in variables.items():
+                # Lox numbers are floats, but embedders will often pass ints.
+                environment[name] = float(value) if type(value) is int else value
+        return closure()
+
+
+_default_evaluator: Optional[Evaluator] = None
+
+def evaluate(source: str, variables: Optional[Mapping[str, Any]] = None) -> Any:
+    """
+    Evaluate source with a shared, default Evaluator.
+    """
+    global _default_evaluator
+    if _default_evaluator is None:
+        _default_evaluator = Evaluator()
+    return _default_evaluator.evaluate(source, variables)
@@ -1,4 +1,7 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from traceback import print_tb
+from typing import Iterator, Optional, TextIO
 from src.tokens import Token
 
 class RuntimeException(Exception):
@@ -7,29 +10,89 @@ class RuntimeException(Exception):
         self.message = message
         self.token = token
 
-_error_occurred = False
-_runtime_error_occurred = False
+class LoxSyntaxError(Exception):
+    """
+    Raised by the embedding API for source which could not be scanned or
+    parsed, holding every (line, message) error that was found.
+    """
+    def __init__(self, errors: list[tuple[int, str]]):
+        super().__init__("\n".join(f"Error on line {line}: {message}" for line, message in errors))
+        self.errors = errors
+
+class RunContext:
+    """
+    The error state and output stream of one run of the interpreter. Each
+    thread, asyncio task or pool worker can run under a context of its own
+    (see run_context), so concurrent runs never see each other's errors.
+    """
+    def __init__(self, out: Optional[TextIO] = None) -> None:
+        # None prints to whatever sys.stdout is at the time.
+        self.out = out
+        self.error_occurred = False
+        self.runtime_error_occurred = False
+        self.collected: Optional[list[tuple[int, str]]] = None
+
+    def print(self, text: str) -> None:
+        print(text, file=self.out)
+
+# Runs that never enter run_context share this one, as they always have.
+_context: ContextVar[RunContext] = ContextVar("run_context", default=RunContext())
+
+def current_context() -> RunContext:
+    return _context.get()
+
+@contextmanager
+def run_context(out: Optional[TextIO] = None) -> Iterator[RunContext]:
+    """
+    Run the body under a fresh RunContext, printing to out.
+    """
+    context = RunContext(out)
+    token = _context.set(context)
+    try:
+        yield context
+    finally:
+        _context.reset(token)
+
 def error(line: int, message: str) -> None:
-    global _error_occurred
-    _error_occurred = True
-    print(f"Error on line {line}: {message}")
+    context = _context.get()
+    if context.collected is not None:
+        context.collected.append((line, message))
+        return
+
+    context.error_occurred = True
+    context.print(f"Error on line {line}: {message}")
+
+@contextmanager
+def collect_errors() -> Iterator[list[tuple[int, str]]]:
+    """
+    Within this context, errors are appended to the yielded list instead of
+    being printed, and do not count towards error_occurred().
+    """
+    context = _context.get()
+    previous = context.collected
+    context.collected = []
+    try:
+        yield context.collected
+    finally:
+        context.collected = previous
 
 def error_occurred(error: bool = None):
-    global _error_occurred
+    context = _context.get()
     if type(error) is bool:
-        _error_occurred = error
+        context.error_occurred = error
 
-    return _error_occurred
+    return context.error_occurred
 
 def runtime_error(error: RuntimeException):
-    print(
+    context = _context.get()
+    context.print(
         f"{error.message} [Line {error.token.line}]"
     )
     runtime_error_occurred(True)
 
 def runtime_error_occurred(error: bool = None):
-    global _runtime_error_occurred
+    context = _context.get()
     if type(error) is bool:
-        _runtime_error_occurred = error
+        context.runtime_error_occurred = error
     
-    return _runtime_error_occurred
\ No newline at end of file
+    return context.runtime_error_occurred
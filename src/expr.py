@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Any, Protocol
+from typing import Any, Iterator, Optional, Protocol
 from .tokens import TokenType, Token
 from abc import ABC, abstractmethod
 
@@ -70,6 +70,14 @@ class Unary(Expr):
         return visitor.visit_unary_expr(self)
 
 
+@dataclass
+class Variable(Expr):
+    name: Token
+
+    def accept(self, visitor: Visitor):
+        return visitor.visit_variable_expr(self)
+
+
 class ASTPrinter(Visitor):
     def print(self, expression: Expr) -> str:
         return expression.accept(self)
@@ -87,10 +95,76 @@ class ASTPrinter(Visitor):
     def visit_unary_expr(self, expr: Unary):
         return self.parenthesize(expr.operator.lexeme, expr.right)
 
+    def visit_variable_expr(self, expr: Variable):
+        return expr.name.lexeme
+
     def parenthesize(self, name: str, *expressions):
         return f"({name} " + " ".join(expr.accept(self) for expr in expressions) + ")"
 
 
+class Children(Visitor):
+    """
+    Gives the direct subexpressions of each node, so that a tree can be
+    walked with an explicit stack instead of recursion, however deep it is.
+    """
+    def visit_binary_expr(self, expr: Binary):
+        return (expr.left, expr.right)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return (expr.expression,)
+
+    def visit_literal_expr(self, expr: Literal):
+        return ()
+
+    def visit_unary_expr(self, expr: Unary):
+        return (expr.right,)
+
+    def visit_variable_expr(self, expr: Variable):
+        return ()
+
+
+class NodeCounter(Children):
+    def count(self, expression: Expr) -> int:
+        count = 0
+        pending = [expression]
+        while pending:
+            count += 1
+            pending += pending.pop().accept(self)
+        return count
+
+
+class PostOrder(Children):
+    """
+    Walks a tree with an explicit stack, yielding each node after its
+    children, left to right: the order in which they are evaluated. Missing
+    operands, left as None by a parse with errors, are yielded as None.
+    """
+    def walk(self, expression: Optional[Expr]) -> Iterator[Optional[Expr]]:
+        pending: list[tuple[Optional[Expr], bool]] = [(expression, False)]
+        while pending:
+            node, children_done = pending.pop()
+            if children_done or node is None:
+                yield node
+                continue
+            children = node.accept(self)
+            if children:
+                pending.append((node, True))
+                pending += ((child, False) for child in reversed(children))
+            else:
+                yield node
+
+
+class DepthCounter(Children):
+    def count(self, expression: Expr) -> int:
+        deepest = 0
+        pending = [(expression, 1)]
+        while pending:
+            node, depth = pending.pop()
+            deepest = max(deepest, depth)
+            pending += ((child, depth + 1) for child in node.accept(self))
+        return deepest
+
+
 def main():
     expression = Binary(
         Unary(
@@ -0,0 +1,346 @@
+import marshal
+from array import array
+from enum import IntEnum
+from math import copysign
+from sys import intern
+from typing import Any, Callable, Iterable, Optional
+
+from .expr import Binary, Expr, Grouping, Literal, PostOrder, Unary, Variable
+from .interpreter import Interpreter
+from .parser import INFIX_PRECEDENCES, KEYWORD_VALUES, ParseError, Parser, Precedence, PREFIX_RULES
+from .regex_scanner import RegexScanner
+from .token_buffer import TOKEN_TYPES, TYPE_CODES
+from .tokens import Token, TokenType
+
+# Nodes are referred to by their index in a FlatTree.
+Node = int
+
+# The index of an operand that is missing, after a syntax error, or of a
+# child a kind of node does not have.
+NO_NODE = -1
+NO_CONSTANT = -1
+
+# Bumped whenever the layout written by FlatTree.to_bytes changes.
+FORMAT = 1
+
+OPERATOR_LEXEMES: dict[TokenType, str] = {token_type: lexeme for lexeme, token_type in RegexScanner.OPERATORS.items()}
+UNARY_CODES = {TYPE_CODES[TokenType.BANG], TYPE_CODES[TokenType.MINUS]}
+BINARY_CODES = {TYPE_CODES[token_type] for token_type in INFIX_PRECEDENCES}
+
+
+class NodeKind(IntEnum):
+    LITERAL = 0
+    VARIABLE = 1
+    GROUPING = 2
+    UNARY = 3
+    BINARY = 4
+
+
+class FlatTree:
+    """
+    An expression stored as parallel typed arrays, one entry per node,
+    instead of a graph of Expr and Token objects. Nodes are in post-order,
+    each after all of its operands, so the last node is the root and a tree
+    can be evaluated in a single pass with a stack of values. Grouping and
+    Unary nodes keep their operand in `rights`.
+
+    Only what the object tree holds is kept: operators are stored as their
+    token type, and the lexemes and lines of Tokens are rebuilt from that.
+    Literal values and variable names are kept in `constants`, each value
+    once for as long as the tree is being built.
+    """
+    COLUMNS = ("kinds", "operators", "lefts", "rights", "constant_indices", "lines")
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        # Only meaningful for Unary and Binary nodes; 0 for the others.
+        self.operators = array("B")
+        self.lefts = array("i")
+        self.rights = array("i")
+        self.constant_indices = array("i")
+        # The line of the operator or variable name; 0 for nodes without one.
+        self.lines = array("i")
+        self.constants: list[Any] = []
+        self.constant_pool: dict[tuple, int] = {}
+
+    def finish(self) -> "FlatTree":
+        """
+        Let go of the pool of constants, which for a tree with many distinct
+        numbers is larger than the columns, once no more nodes will be added.
+        """
+        self.constant_pool = {}
+        return self
+
+    def add(self, kind: NodeKind, operator: int = 0, left: Node = NO_NODE, right: Node = NO_NODE, constant: int = NO_CONSTANT, line: int = 0) -> Node:
+        self.kinds.append(kind)
+        self.operators.append(operator)
+        self.lefts.append(left)
+        self.rights.append(right)
+        self.constant_indices.append(constant)
+        self.lines.append(line)
+        return len(self.kinds) - 1
+
+    def add_literal(self, value: Any) -> Node:
+        return self.add(NodeKind.LITERAL, constant=self.add_constant(value))
+
+    def add_variable(self, name: Token) -> Node:
+        return self.add(NodeKind.VARIABLE, constant=self.add_constant(name.lexeme), line=name.line)
+
+    def add_grouping(self, expression: Node) -> Node:
+        return self.add(NodeKind.GROUPING, right=expression)
+
+    def add_unary(self, operator: Token, right: Node) -> Node:
+        return self.add(NodeKind.UNARY, TYPE_CODES[operator.token_type], right=right, line=operator.line)
+
+    def add_binary(self, left: Node, operator: Token, right: Node) -> Node:
+        return self.add(NodeKind.BINARY, TYPE_CODES[operator.token_type], left, right, line=operator.line)
+
+    def add_constant(self, value: Any) -> int:
+        # Keyed by type, so that e.g. true and 1 never share a slot, and by
+        # sign, so that 0.0 and -0.0 do not either.
+        key = (type(value), value, copysign(1.0, value) if type(value) is float else 0)
+        index = self.constant_pool.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(intern(value) if type(value) is str else value)
+            self.constant_pool[key] = index
+        return index
+
+    @property
+    def root(self) -> Node:
+        return len(self.kinds) - 1
+
+    def kind(self, node: Node) -> NodeKind:
+        return NodeKind(self.kinds[node])
+
+    def constant(self, node: Node) -> Any:
+        return self.constants[self.constant_indices[node]]
+
+    def operator(self, node: Node) -> Token:
+        token_type = TOKEN_TYPES[self.operators[node]]
+        return Token(token_type, OPERATOR_LEXEMES[token_type], None, self.lines[node])
+
+    def name(self, node: Node) -> Token:
+        return Token(TokenType.IDENTIFIER, self.constant(node), None, self.lines[node])
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def nbytes(self) -> int:
+        """
+        The number of bytes used by the columns, not counting the constants.
+        """
+        return sum(getattr(self, column).itemsize * len(self) for column in self.COLUMNS)
+
+    def to_bytes(self) -> bytes:
+        """
+        The tree as bytes, to be read back by from_bytes in any process on
+        the same machine. Trees also pickle as they are.
+        """
+        return marshal.dumps((FORMAT, *(getattr(self, column).tobytes() for column in self.COLUMNS), self.constants))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FlatTree":
+        """
+        Read a tree written by to_bytes, raising ValueError if data does not
+        hold exactly one well-formed tree.
+        """
+        try:
+            fields = marshal.loads(data)
+        except (EOFError, MemoryError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid tree: {e}") from None
+        if type(fields) is not tuple or len(fields) != len(cls.COLUMNS) + 2 or fields[0] != FORMAT:
+            raise ValueError("Invalid tree: unknown format.")
+
+        tree = cls()
+        for column, data in zip(cls.COLUMNS, fields[1:]):
+            column = getattr(tree, column)
+            if type(data) is not bytes or len(data) % column.itemsize:
+                raise ValueError("Invalid tree: damaged column.")
+            column.frombytes(data)
+        tree.constants = fields[-1]
+        tree.validate()
+        return tree
+
+    def validate(self) -> None:
+        """
+        Raise ValueError unless every column is as long as the others and
+        the nodes are in post-order, each with the operands and constant its
+        kind needs, forming a single tree.
+        """
+        if any(len(getattr(self, column)) != len(self) for column in self.COLUMNS):
+            raise ValueError("Invalid tree: columns differ in length.")
+        if type(self.constants) is not list or any(value is not None and type(value) not in (bool, int, float, str) for value in self.constants):
+            raise ValueError("Invalid tree: invalid constants.")
+
+        # The nodes whose parents are still to come.
+        roots: list[Node] = []
+        for node in range(len(self)):
+            kind = self.kinds[node]
+            if kind > NodeKind.BINARY:
+                raise ValueError(f"Invalid tree: node {node} has an invalid kind.")
+            if kind in (NodeKind.LITERAL, NodeKind.VARIABLE) and not 0 <= self.constant_indices[node] < len(self.constants):
+                raise ValueError(f"Invalid tree: node {node} has no constant.")
+            if kind == NodeKind.VARIABLE and type(self.constant(node)) is not str:
+                raise ValueError(f"Invalid tree: node {node} has an invalid name.")
+            if kind == NodeKind.UNARY and self.operators[node] not in UNARY_CODES or kind == NodeKind.BINARY and self.operators[node] not in BINARY_CODES:
+                raise ValueError(f"Invalid tree: node {node} has an invalid operator.")
+
+            operands = (self.lefts[node], self.rights[node]) if kind == NodeKind.BINARY else (self.rights[node],) if kind in (NodeKind.GROUPING, NodeKind.UNARY) else ()
+            for operand in reversed(operands):
+                if operand != NO_NODE and (not roots or roots.pop() != operand):
+                    raise ValueError(f"Invalid tree: node {node} is not right after its operands.")
+            roots.append(node)
+        if len(roots) > 1:
+            raise ValueError("Invalid tree: more than one root.")
+
+
+def flatten(expr: Optional[Expr]) -> FlatTree:
+    """
+    Store an expression tree as a FlatTree. Missing operands are kept as
+    NO_NODE, and a missing expression gives an empty tree. The tree is walked
+    with an explicit stack, so it may be of any depth.
+    """
+    tree = FlatTree()
+    # The indices of the finished subtrees whose parents are still to come.
+    done: list[Node] = []
+    for node in PostOrder().walk(expr):
+        kind = type(node)
+        if node is None:
+            if expr is not None:
+                done.append(NO_NODE)
+        elif kind is Literal:
+            done.append(tree.add_literal(node.value))
+        elif kind is Variable:
+            done.append(tree.add_variable(node.name))
+        elif kind is Binary:
+            right = done.pop()
+            done.append(tree.add_binary(done.pop(), node.operator, right))
+        elif kind is Unary:
+            done.append(tree.add_unary(node.operator, done.pop()))
+        else:
+            done.append(tree.add_grouping(done.pop()))
+    return tree.finish()
+
+
+def unflatten(tree: FlatTree) -> Optional[Expr]:
+    """
+    Rebuild the expression tree stored in a FlatTree, for use with the
+    visitors, such as ASTPrinter, which walk Expr objects.
+    """
+    nodes: list[Optional[Expr]] = []
+
+    def child(node: Node) -> Optional[Expr]:
+        return None if node == NO_NODE else nodes[node]
+
+    for node in range(len(tree)):
+        kind = tree.kinds[node]
+        if kind == NodeKind.LITERAL:
+            nodes.append(Literal(tree.constant(node)))
+        elif kind == NodeKind.VARIABLE:
+            nodes.append(Variable(tree.name(node)))
+        elif kind == NodeKind.GROUPING:
+            nodes.append(Grouping(child(tree.rights[node])))
+        elif kind == NodeKind.UNARY:
+            nodes.append(Unary(tree.operator(node), child(tree.rights[node])))
+        else:
+            nodes.append(Binary(child(tree.lefts[node]), tree.operator(node), child(tree.rights[node])))
+    return nodes[-1] if nodes else None
+
+
+class FlatParser(Parser):
+    """
+    A Parser which adds each node to a FlatTree as soon as it is parsed,
+    rather than creating Expr objects, so that its nodes come out in
+    post-order. It parses exactly as Parser does, reporting the same errors
+    and leaving the same holes, and its parse() returns the FlatTree.
+    """
+    def __init__(self, tokens: Iterable[Token]) -> None:
+        super().__init__(tokens)
+        self.tree = FlatTree()
+
+    def parse(self) -> Optional[FlatTree]:
+        try:
+            self.expression()
+        except ParseError:
+            return
+        # Like Parser, give None if there is no expression at all.
+        return self.tree.finish() if len(self.tree) else None
+
+    def parse_precedence(self, precedence: Precedence) -> Node:
+        token = self.current_token
+        prefix = FLAT_PREFIX_RULES.get(token.token_type)
+        if prefix is None:
+            self.error(token, "Expected expression.")
+            expr = NO_NODE
+        else:
+            self.advance()
+            expr = prefix(self, token)
+
+        while INFIX_PRECEDENCES.get(self.current_token.token_type, Precedence.NONE) >= precedence:
+            operator: Token = self.advance()
+            right = self.parse_precedence(INFIX_PRECEDENCES[operator.token_type] + 1)
+            expr = self.tree.add_binary(expr, operator, right)
+
+        return expr
+
+    def keyword(self, token: Token) -> Node:
+        return self.tree.add_literal(KEYWORD_VALUES[token.token_type])
+
+    def literal(self, token: Token) -> Node:
+        return self.tree.add_literal(token.literal)
+
+    def variable(self, token: Token) -> Node:
+        return self.tree.add_variable(token)
+
+    def grouping(self, token: Token) -> Node:
+        expr = self.expression()
+        self.consume(TokenType.RIGHT_PAREN, "Expected ')' after '(' expression.")
+        return self.tree.add_grouping(expr)
+
+    def prefix_operator(self, token: Token) -> Node:
+        return self.tree.add_unary(token, self.parse_precedence(Precedence.UNARY))
+
+
+# The same rules as Parser's, calling FlatParser's handlers.
+FLAT_PREFIX_RULES: dict[TokenType, Callable[[FlatParser, Token], Node]] = {
+    token_type: getattr(FlatParser, rule.__name__) for token_type, rule in PREFIX_RULES.items()
+}
+
+
+class FlatInterpreter(Interpreter):
+    """
+    An Interpreter for FlatTrees. It runs through the nodes in order,
+    keeping operand values on a stack, and applies operators exactly as the
+    tree-walker does, so the results and errors are the same.
+    """
+    def evaluate(self, tree: FlatTree) -> Any:
+        kinds, operators, lines = tree.kinds, tree.operators, tree.lines
+        constant_indices, constants = tree.constant_indices, tree.constants
+        environment = self.environment
+        # Operator tokens are only made once for each operator and line.
+        tokens: dict[int, Token] = {}
+        values: list[Any] = []
+
+        for node in range(len(kinds)):
+            kind = kinds[node]
+            if kind == NodeKind.LITERAL:
+                values.append(constants[constant_indices[node]])
+            elif kind == NodeKind.VARIABLE:
+                name = constants[constant_indices[node]]
+                values.append(environment[name] if name in environment else self.look_up(tree.name(node)))
+            elif kind == NodeKind.GROUPING:
+                # The value of its expression is already on top.
+                continue
+            else:
+                key = lines[node] << 8 | operators[node]
+                operator = tokens.get(key)
+                if operator is None:
+                    operator = tokens[key] = tree.operator(node)
+                if kind == NodeKind.UNARY:
+                    values[-1] = self.unary(operator, values[-1])
+                else:
+                    right = values.pop()
+                    values[-1] = self.binary(operator, values[-1], right)
+
+        return values.pop()
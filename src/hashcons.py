@@ -0,0 +1,124 @@
+from typing import Any, Hashable, Optional
+
+from .expr import Binary, Children, Expr, Grouping, Literal, PostOrder, Unary, Variable, Visitor
+from .interpreter import Interpreter
+from .iterative import IterativeInterpreter
+
+
+class Interner(Visitor):
+    """
+    Hash-conses expression trees: every structurally identical subtree is
+    replaced by one shared node, turning the tree into a DAG.
+
+    Operator tokens are compared by type and lexeme only, so duplicates on
+    different lines are merged too. The node kept is the first one in
+    evaluation order, which is also the one that would raise first, so
+    runtime errors are still reported on the same line.
+    """
+    def __init__(self) -> None:
+        self.table: dict[Hashable, Expr] = {}
+        # Ids of the nodes reached more than once, which are the only ones
+        # worth memoizing during evaluation.
+        self.shared: set[int] = set()
+
+    def clear(self) -> None:
+        self.table.clear()
+        self.shared.clear()
+
+    def intern(self, expr: Expr) -> Expr:
+        # Long chains of operators make deep trees, so rather than recursing,
+        # the nodes are interned children first, each visit taking the
+        # interned children from a stack of results.
+        self.results: list[Expr] = []
+        for node in PostOrder().walk(expr):
+            self.results.append(node.accept(self))
+        return self.results.pop()
+
+    def canonical(self, key: Hashable, expr: Expr) -> Expr:
+        node = self.table.get(key)
+        if node is None:
+            self.table[key] = expr
+            return expr
+        self.shared.add(id(node))
+        return node
+
+    def visit_literal_expr(self, expr: Literal):
+        # repr tells apart values which compare equal, like 0.0 and -0.0 or
+        # 1.0 and true.
+        return self.canonical(("L", type(expr.value), repr(expr.value)), expr)
+
+    def visit_variable_expr(self, expr: Variable):
+        return self.canonical(("V", expr.name.lexeme), expr)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        inner = self.results.pop()
+        return self.canonical(("G", id(inner)), Grouping(inner))
+
+    def visit_unary_expr(self, expr: Unary):
+        right = self.results.pop()
+        operator = expr.operator
+        return self.canonical(("U", operator.token_type, operator.lexeme, id(right)), Unary(operator, right))
+
+    def visit_binary_expr(self, expr: Binary):
+        right = self.results.pop()
+        left = self.results.pop()
+        operator = expr.operator
+        return self.canonical(
+            ("B", id(left), operator.token_type, operator.lexeme, id(right)),
+            Binary(left, operator, right)
+        )
+
+
+def count_unique_nodes(expr: Expr) -> int:
+    """
+    Count the distinct node objects reachable from expr, each shared node
+    only once.
+    """
+    children = Children()
+    seen: set[int] = set()
+    pending = [expr]
+    while pending:
+        node = pending.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        pending += node.accept(children)
+    return len(seen)
+
+
+class MemoizingInterpreter(Interpreter):
+    """
+    An Interpreter which evaluates each shared node of a DAG from Interner
+    once per evaluation, reusing its value wherever else it is reached.
+    Expressions have no side effects, so this cannot change the result.
+    """
+    def __init__(self, shared: Optional[set[int]] = None, environment: Optional[dict[str, Any]] = None) -> None:
+        super().__init__(environment)
+        # Without a set of shared nodes, every node is memoized.
+        self.shared = shared
+        self.memo: Optional[dict[int, Any]] = None
+
+    def evaluate(self, expr: Expr) -> Any:
+        if self.memo is not None:
+            return self.evaluate_memoized(expr)
+
+        # A new top-level evaluation; variables may have changed since the last.
+        self.memo = {}
+        try:
+            return self.evaluate_memoized(expr)
+        except RecursionError:
+            # Very deep trees are walked with an explicit stack instead, each
+            # shared node being evaluated wherever it is reached.
+            return IterativeInterpreter(self.environment).value(expr)
+        finally:
+            self.memo = None
+
+    def evaluate_memoized(self, expr: Expr) -> Any:
+        key = id(expr)
+        if key in self.memo:
+            return self.memo[key]
+
+        value = expr.accept(self)
+        if self.shared is None or key in self.shared:
+            self.memo[key] = value
+        return value
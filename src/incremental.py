@@ -0,0 +1,414 @@
+from dataclasses import dataclass
+from itertools import chain
+from typing import Callable, Optional
+
+from .error import collect_errors
+from .expr import Binary, Expr, Grouping, Literal, PostOrder, Unary, Variable
+from .parser import Parser
+from .scanner import Scanner
+from .tokens import Token, TokenType
+
+
+# The parser rule which produces each kind of binary node, and so the rule
+# a node must be parsed again with.
+RULES = {
+    TokenType.BANG_EQUAL: "equality",
+    TokenType.EQUAL_EQUAL: "equality",
+    TokenType.GREATER: "comparison",
+    TokenType.GREATER_EQUAL: "comparison",
+    TokenType.LESS: "comparison",
+    TokenType.LESS_EQUAL: "comparison",
+    TokenType.MINUS: "term",
+    TokenType.PLUS: "term",
+    TokenType.SLASH: "factor",
+    TokenType.STAR: "factor",
+}
+
+# Once the subtrees tried for an edit span more than this fraction of the
+# tokens between them, a full parse is cheaper than trying any more.
+REPARSE_LIMIT = 0.5
+
+
+@dataclass
+class EditResult:
+    # Tokens produced by scanning the edited region again.
+    rescanned: int = 0
+    # Old tokens replaced, and the new ones which replaced them.
+    removed_tokens: int = 0
+    inserted_tokens: int = 0
+    # Tokens spanned by the subtree which was parsed again; the whole
+    # expression if full_reparse is set.
+    reparsed: int = 0
+    full_reparse: bool = False
+
+
+def count_tokens(expr: Expr, lengths: dict[int, int]) -> int:
+    """
+    Record in lengths how many tokens each node of the well-formed tree
+    expr spans, returning the count for expr itself. Long chains of
+    operators make deep trees, so this does not recurse.
+    """
+    for node in PostOrder().walk(expr):
+        if isinstance(node, (Literal, Variable)):
+            lengths[id(node)] = 1
+        elif isinstance(node, Binary):
+            lengths[id(node)] = lengths[id(node.left)] + 1 + lengths[id(node.right)]
+        elif isinstance(node, Unary):
+            lengths[id(node)] = 1 + lengths[id(node.right)]
+        else:
+            lengths[id(node)] = lengths[id(node.expression)] + 2
+    return lengths[id(expr)]
+
+
+class Document:
+    """
+    A source, with its tokens and expression, kept up to date as it is
+    edited. Each edit scans again only from shortly before it until the
+    scanner falls back in step with the old tokens, and parses again only
+    the smallest subtree that encloses the changed tokens. The tokens,
+    expression and errors are always those a full scan and parse of the new
+    source would give.
+
+    Edits move the offsets and lines of every token after them. Rather than
+    updating them all, the shift is recorded and applied lazily, so that an
+    edit costs time in proportion to its size and its distance from the
+    previous edit. Reading tokens or expression applies it in full.
+    """
+    def __init__(self, source: str) -> None:
+        self.source = source
+        with collect_errors() as errors:
+            scanner = Scanner(source)
+            self._tokens: list[Token] = []
+            self._starts: list[int] = []
+            self._scan_errors: list[tuple[int, int, str]] = []
+            self.scan(scanner, errors, self._tokens, self._starts)
+        self._tokens.append(Token(TokenType.EOF, "", None, scanner.line))
+        self._starts.append(len(source))
+
+        # Tokens from index _pending onwards are yet to be moved by
+        # _offset_shift characters and _line_shift lines.
+        self._pending = len(self._tokens)
+        self._offset_shift = 0
+        self._line_shift = 0
+
+        self._lengths: dict[int, int] = {}
+        self.parse_all()
+
+    @property
+    def tokens(self) -> list[Token]:
+        self.settle(len(self._tokens))
+        return self._tokens
+
+    @property
+    def starts(self) -> list[int]:
+        """
+        The offset in source of every token.
+        """
+        self.settle(len(self._tokens))
+        return self._starts
+
+    @property
+    def expression(self) -> Optional[Expr]:
+        # The tree holds the tokens themselves, so their lines must be right.
+        self.settle(len(self._tokens))
+        return self._expression
+
+    @property
+    def errors(self) -> list[tuple[int, str]]:
+        """
+        Every scan error, then every parse error, as (line, message).
+        """
+        return [(line, message) for _, line, message in self._scan_errors] + self._parse_errors
+
+    def scan(self, scanner: Scanner, errors: list[tuple[int, str]], tokens: list[Token], starts: list[int], resume_at: Optional[Callable[[int], Optional[int]]] = None) -> Optional[int]:
+        """
+        Scan tokens, and their offsets, into tokens and starts until resume_at, called with the start
+        of each new token, returns the index of an old token which the new
+        one is the same as. Returns that index, or None if the scanner
+        reached the end of the source instead.
+        """
+        while not scanner.at_end():
+            scanner.start = scanner.current
+            count = len(errors)
+            scanner.scan_token()
+            for line, message in errors[count:]:
+                self._scan_errors.append((scanner.start, line, message))
+            if not scanner.tokens:
+                continue
+
+            token = scanner.tokens.pop()
+            index = resume_at and resume_at(scanner.start)
+            if index is not None:
+                return index
+            tokens.append(token)
+            starts.append(scanner.start)
+        return None
+
+    def start(self, index: int) -> int:
+        return self._starts[index] + (self._offset_shift if index >= self._pending else 0)
+
+    def line(self, index: int) -> int:
+        return self._tokens[index].line + (self._line_shift if index >= self._pending else 0)
+
+    def settle(self, end: int) -> None:
+        """
+        Apply the pending shift to the tokens before index end.
+        """
+        if end <= self._pending:
+            return
+        if self._offset_shift:
+            for index in range(self._pending, end):
+                self._starts[index] += self._offset_shift
+        if self._line_shift:
+            for token in self._tokens[self._pending:end]:
+                token.line += self._line_shift
+        self._pending = end
+
+    def unsettle(self, start: int) -> None:
+        """
+        Make the pending shift start from index start instead, which must
+        come before it.
+        """
+        if self._offset_shift:
+            for index in range(start, self._pending):
+                self._starts[index] -= self._offset_shift
+        if self._line_shift:
+            for token in self._tokens[start:self._pending]:
+                token.line -= self._line_shift
+        self._pending = start
+
+    def find(self, offset: int) -> int:
+        """
+        The index of the last token (not counting EOF) which starts before
+        offset, or -1 if there is none.
+        """
+        low, high = 0, len(self._tokens) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if self.start(middle) < offset:
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1
+
+    def edit(self, offset: int, removed: int, inserted: str) -> EditResult:
+        """
+        Replace the `removed` characters at offset with inserted.
+        """
+        if not 0 <= offset <= offset + removed <= len(self.source):
+            raise ValueError(f"Edit of {removed} characters at {offset} is outside the source.")
+
+        delta = len(inserted) - removed
+        self.source = self.source[:offset] + inserted + self.source[offset + removed:]
+        result = EditResult()
+
+        # Scanning resumes a token earlier than the edit strictly needs, as
+        # a number may have peeked past its end into the token after it.
+        restart = self.find(offset) - 1
+        end_of_file = len(self._tokens) - 1
+        if restart >= 0:
+            resume_offset = self.start(restart)
+            resume_line = self.line(restart) - self._tokens[restart].lexeme.count("\n")
+        else:
+            restart, resume_offset, resume_line = 0, 0, 1
+
+        # Scan errors from the region scanned again are replaced.
+        old_errors = self._scan_errors
+        self._scan_errors = [error for error in old_errors if error[0] < resume_offset]
+
+        scanner = Scanner(self.source)
+        scanner.current = resume_offset
+        scanner.line = resume_line
+        edit_end = offset + len(inserted)
+        cursor = restart
+
+        def resume_at(start: int) -> Optional[int]:
+            # Past the edit, the rest of the source is as it was, so from the
+            # first new token which starts where an old one did (once moved)
+            # onwards, the old tokens are right. New tokens come in order, so
+            # the old ones are searched from where the last search stopped.
+            nonlocal cursor
+            if start < edit_end:
+                return None
+            while cursor < end_of_file and self.start(cursor) + delta < start:
+                cursor += 1
+            if cursor < end_of_file and self.start(cursor) + delta == start:
+                return cursor
+            return None
+
+        fresh: list[Token] = []
+        fresh_starts: list[int] = []
+        with collect_errors() as errors:
+            synced = self.scan(scanner, errors, fresh, fresh_starts, resume_at)
+
+        # The token the scanner stopped on, or the end of the file, is where
+        # it was, moved by the edit.
+        old = end_of_file if synced is None else synced
+        line_shift = scanner.line - self.line(old)
+        result.rescanned = len(fresh)
+
+        # Scan errors after the region are those of before, moved.
+        if synced is not None:
+            resumed_from = self.start(synced)
+            self._scan_errors += [
+                (error_offset + delta, line + line_shift, message)
+                for error_offset, line, message in old_errors if error_offset >= resumed_from
+            ]
+            self._scan_errors.sort(key=lambda error: error[0])
+
+        # Tokens scanned again which came out the same as before are kept, so
+        # that the tree can go on referring to them.
+        first, last = restart, old
+        low, high = 0, len(fresh)
+        while low < high and first < last and self.same(first, fresh[low], fresh_starts[low], 0, 0):
+            first += 1
+            low += 1
+        while low < high and first < last and self.same(last - 1, fresh[high - 1], fresh_starts[high - 1], delta, line_shift):
+            last -= 1
+            high -= 1
+
+        # The pending shift is moved to start where the untouched tokens do.
+        if self._pending < last:
+            self.settle(last)
+        elif self._pending > last:
+            self.unsettle(last)
+        self._tokens[first:last] = fresh[low:high]
+        self._starts[first:last] = fresh_starts[low:high]
+        self._pending = first + high - low
+        self._offset_shift += delta
+        self._line_shift += line_shift
+
+        result.removed_tokens = last - first
+        result.inserted_tokens = high - low
+        self.reparse(first, last, high - low, result)
+        return result
+
+    def same(self, index: int, token: Token, start: int, offset_shift: int, line_shift: int) -> bool:
+        old = self._tokens[index]
+        return (
+            old.token_type is token.token_type and old.lexeme == token.lexeme
+            and self.start(index) + offset_shift == start and self.line(index) + line_shift == token.line
+        )
+
+    def parse_all(self) -> None:
+        self.settle(len(self._tokens))
+        self._lengths.clear()
+        with collect_errors() as errors:
+            self._expression = Parser(self._tokens).parse()
+        self._parse_errors = errors
+        if not errors and self._expression is not None:
+            count_tokens(self._expression, self._lengths)
+
+    def reparse(self, first: int, last: int, inserted: int, result: EditResult) -> None:
+        """
+        Parse again after tokens first to last were replaced by inserted new
+        ones, reusing as much of the old tree as possible.
+        """
+        if first == last and not inserted and not self._parse_errors:
+            return
+        if self._parse_errors or self._expression is None:
+            result.full_reparse = True
+            result.reparsed = len(self._tokens) - 1
+            self.parse_all()
+            return
+
+        # Find every node whose tokens include the replaced ones, from the
+        # root down, with the field each is held in.
+        lengths = self._lengths
+        path: list[tuple[Optional[Expr], str, Expr, int]] = []
+        parent: Optional[Expr] = None
+        field = ""
+        node = self._expression
+        start = 0
+        while start <= first and last <= start + lengths[id(node)]:
+            path.append((parent, field, node, start))
+            parent = node
+            if isinstance(node, Binary):
+                right = start + lengths[id(node.left)] + 1
+                if right <= first:
+                    field, node, start = "right", node.right, right
+                else:
+                    field, node = "left", node.left
+            elif isinstance(node, Unary):
+                field, node, start = "right", node.right, start + 1
+            elif isinstance(node, Grouping):
+                field, node, start = "expression", node.expression, start + 1
+            else:
+                break
+
+        # The deepest such node which parses again into exactly the same
+        # tokens, followed by the same token, is replaced. An edit which
+        # leaves no subtree parsable, deep in a long chain, would otherwise
+        # try each of its thousands of ancestors.
+        change = inserted - (last - first)
+        budget = REPARSE_LIMIT * len(self._tokens)
+        for parent, field, node, start in reversed(path):
+            length = lengths[id(node)] + change
+            budget -= length
+            if budget < 0:
+                break
+            replacement = self.parse_rule(self.rule(node), start, length)
+            if replacement is None:
+                continue
+
+            self.forget(node)
+            if parent is None:
+                self._expression = replacement
+            else:
+                setattr(parent, field, replacement)
+            for ancestor in path:
+                if ancestor[2] is node:
+                    break
+                lengths[id(ancestor[2])] += change
+            result.reparsed = length
+            return
+
+        result.full_reparse = True
+        result.reparsed = len(self._tokens) - 1
+        self.parse_all()
+
+    def rule(self, node: Expr) -> str:
+        if isinstance(node, Binary):
+            return RULES[node.operator.token_type]
+        # A unary expression may stand wherever a literal, variable or
+        # grouping can, so they are all parsed again with the same rule.
+        return "unary"
+
+    def parse_rule(self, rule: str, start: int, length: int) -> Optional[Expr]:
+        """
+        Parse the length tokens from index start with the named parser rule,
+        returning the result only if it has no errors, spans exactly those
+        tokens and stops at the token after them.
+        """
+        tokens = self._tokens
+        follow = tokens[start + length]
+        # The parser is given only the tokens to parse and the one after
+        # them, so that it takes time in their number rather than in the
+        # rest of the file. A rule which would go on past that token runs
+        # into the end instead, and fails.
+        parser = Parser(chain(
+            map(tokens.__getitem__, range(start, start + length + 1)),
+            (Token(TokenType.EOF, "", None, follow.line),),
+        ))
+        with collect_errors() as errors:
+            expr = getattr(parser, rule)()
+        if errors or expr is None or parser.peek() is not follow:
+            return None
+
+        lengths: dict[int, int] = {}
+        if count_tokens(expr, lengths) != length:
+            return None
+        self._lengths.update(lengths)
+        return expr
+
+    def forget(self, node: Expr) -> None:
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            del self._lengths[id(node)]
+            if isinstance(node, Binary):
+                pending += (node.left, node.right)
+            elif isinstance(node, Unary):
+                pending.append(node.right)
+            elif isinstance(node, Grouping):
+                pending.append(node.expression)
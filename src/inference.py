@@ -0,0 +1,281 @@
+import operator as op
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Any, Callable, Optional
+
+from .error import RuntimeException
+from .expr import Binary, Expr, Literal, PostOrder, Unary, Variable
+from .iterative import IterativeInterpreter
+from .numeric import exact
+from .rope import concatenate, flatten
+from .tokens import Token, TokenType
+
+
+class LoxType(Enum):
+    NUMBER = auto()
+    STRING = auto()
+    BOOL = auto()
+    NIL = auto()
+    # Anything, as far as the pass can tell; variables are always unknown.
+    UNKNOWN = auto()
+
+
+ARITHMETIC = {TokenType.MINUS, TokenType.STAR, TokenType.SLASH}
+COMPARISONS = {TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL}
+EQUALITIES = {TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL}
+
+# Types which are certainly neither numbers nor strings.
+NEITHER = {LoxType.BOOL, LoxType.NIL}
+
+
+@dataclass
+class StaticTypeError:
+    """
+    An operation which cannot succeed, whatever the variables hold, should
+    it ever be evaluated.
+    """
+    token: Token
+    message: str
+
+
+def type_of(value: Any) -> LoxType:
+    if value is None:
+        return LoxType.NIL
+    if type(value) is bool:
+        return LoxType.BOOL
+    if type(value) is str:
+        return LoxType.STRING
+    return LoxType.NUMBER
+
+
+class TypeInference:
+    """
+    Infers the type of every node of an expression from its literals and
+    operators, recording in `types` the type each node has whenever its
+    evaluation succeeds, in `operations` the operand types of each operator,
+    and in `errors` the operations which are certain to fail. The tree is
+    walked with an explicit stack, so it may be of any depth.
+    """
+    def __init__(self) -> None:
+        self.types: dict[int, LoxType] = {}
+        self.errors: list[StaticTypeError] = []
+        # Every Binary and Unary node, children first, with the types of
+        # its operands (the second is None for a Unary node).
+        self.operations: list[tuple[Expr, LoxType, Optional[LoxType]]] = []
+
+    def infer(self, expr: Expr) -> LoxType:
+        types = self.types
+        for node in PostOrder().walk(expr):
+            kind = type(node)
+            if kind is Literal:
+                types[id(node)] = type_of(node.value)
+            elif kind is Variable:
+                types[id(node)] = LoxType.UNKNOWN
+            elif kind is Binary:
+                left, right = types[id(node.left)], types[id(node.right)]
+                types[id(node)] = self.binary(node.operator, left, right)
+                self.operations.append((node, left, right))
+            elif kind is Unary:
+                right = types[id(node.right)]
+                types[id(node)] = self.unary(node.operator, right)
+                self.operations.append((node, right, None))
+            else:
+                types[id(node)] = types[id(node.expression)]
+        return types[id(expr)]
+
+    def unary(self, operator: Token, right: LoxType) -> LoxType:
+        if operator.token_type is TokenType.BANG:
+            return LoxType.BOOL
+
+        if right not in (LoxType.NUMBER, LoxType.UNKNOWN):
+            self.report(operator, "Operand must be a number.")
+        return LoxType.NUMBER
+
+    def binary(self, operator: Token, left: LoxType, right: LoxType) -> LoxType:
+        token_type = operator.token_type
+        if token_type is TokenType.PLUS:
+            if left in NEITHER or right in NEITHER:
+                self.report(operator, "Operators must both be floats or strings.")
+            if left is LoxType.NUMBER and right is LoxType.NUMBER:
+                return LoxType.NUMBER
+            if LoxType.STRING in (left, right):
+                return LoxType.STRING
+            return LoxType.UNKNOWN
+
+        if token_type in ARITHMETIC:
+            if left not in (LoxType.NUMBER, LoxType.UNKNOWN) or right not in (LoxType.NUMBER, LoxType.UNKNOWN):
+                self.report(operator, "Operands must be numbers.")
+            return LoxType.NUMBER
+
+        if token_type in COMPARISONS:
+            # With a string on either side both are compared as strings, so
+            # only two known non-strings, not both numbers, must fail.
+            could_be_string = LoxType.UNKNOWN in (left, right) or LoxType.STRING in (left, right)
+            if not could_be_string and (left in NEITHER or right in NEITHER):
+                self.report(operator, f"Comparison {operator.lexeme} of {left.name.lower()} is not possible with {right.name.lower()}.")
+        return LoxType.BOOL
+
+    def report(self, operator: Token, message: str) -> None:
+        self.errors.append(StaticTypeError(operator, message))
+
+
+Operation = Callable[[Any, Any], Any]
+
+
+def add_numbers(left: Any, right: Any) -> Any:
+    result = left + right
+    return exact(result) if type(result) is int else result
+
+def subtract_numbers(left: Any, right: Any) -> Any:
+    result = left - right
+    return exact(result) if type(result) is int else result
+
+def multiply_numbers(left: Any, right: Any) -> Any:
+    result = left * right
+    if type(result) is not int:
+        return result
+    if result == 0 and (left < 0 or right < 0):
+        return -0.0
+    return exact(result)
+
+def negate_number(right: Any) -> Any:
+    # An int 0 negates to the float -0.0, as Interpreter.unary does.
+    return -right if right or type(right) is float else -0.0
+
+
+# Operations on two numbers, or two strings, which need no checks at all.
+NUMBER_OPERATIONS: dict[TokenType, Operation] = {
+    TokenType.PLUS: add_numbers,
+    TokenType.MINUS: subtract_numbers,
+    TokenType.STAR: multiply_numbers,
+    TokenType.GREATER: op.gt,
+    TokenType.GREATER_EQUAL: op.ge,
+    TokenType.LESS: op.lt,
+    TokenType.LESS_EQUAL: op.le,
+    TokenType.EQUAL_EQUAL: op.eq,
+    TokenType.BANG_EQUAL: op.ne,
+}
+
+def compare_strings(operation: Operation) -> Operation:
+    # Strings built by + may be ropes, which compare as their text.
+    return lambda left, right: operation(flatten(left), flatten(right))
+
+STRING_OPERATIONS: dict[TokenType, Operation] = {
+    TokenType.PLUS: concatenate,
+    TokenType.GREATER: compare_strings(op.gt),
+    TokenType.GREATER_EQUAL: compare_strings(op.ge),
+    TokenType.LESS: compare_strings(op.lt),
+    TokenType.LESS_EQUAL: compare_strings(op.le),
+    TokenType.EQUAL_EQUAL: compare_strings(op.eq),
+    TokenType.BANG_EQUAL: compare_strings(op.ne),
+}
+
+
+class TypedInterpreter(IterativeInterpreter):
+    """
+    An Interpreter which infers the types of an expression before running
+    it, and evaluates each operation whose operand types are proven with a
+    specialized number-only or string-only function, skipping the checks.
+    Everything else takes the usual checked path, so the results and errors
+    are the same. Trees too deep to recurse through are evaluated with the
+    explicit stack of IterativeInterpreter.
+    """
+    def __init__(self, environment: Optional[dict[str, Any]] = None) -> None:
+        super().__init__(environment)
+        # Keyed by the id of each operator's token, which no two nodes share,
+        # as IterativeInterpreter passes on only the token.
+        self.operations: dict[int, Callable] = {}
+        # Kept alive, so that the ids in operations cannot be reused.
+        self.specialized: Optional[Expr] = None
+        # Whether an evaluation is recursing through the tree.
+        self.walking = False
+
+    def interpret(self, expr: Expr):
+        if expr is not self.specialized:
+            self.specialize(expr)
+        super().interpret(expr)
+
+    def specialize(self, expr: Expr) -> None:
+        """
+        Choose the operations to evaluate expr with, once for however many
+        times it is interpreted. Other expressions are evaluated with checks
+        until they are specialized in turn.
+        """
+        inference = TypeInference()
+        inference.infer(expr)
+
+        operations = {}
+        for node, left, right in inference.operations:
+            if type(node) is Binary:
+                operation = self.binary_operation(node.operator, left, right)
+            else:
+                operation = self.unary_operation(node.operator, left)
+            if operation is not None:
+                operations[id(node.operator)] = operation
+        self.operations = operations
+        self.specialized = expr
+
+    def binary_operation(self, operator: Token, left: LoxType, right: LoxType) -> Optional[Operation]:
+        if left is LoxType.NUMBER and right is LoxType.NUMBER:
+            if operator.token_type is TokenType.SLASH:
+                def divide(left: Any, right: Any) -> Any:
+                    if right == 0:
+                        raise RuntimeException("Division by zero error", operator)
+                    return left / right
+                return divide
+            return NUMBER_OPERATIONS.get(operator.token_type)
+        if left is LoxType.STRING and right is LoxType.STRING:
+            return STRING_OPERATIONS.get(operator.token_type)
+        if operator.token_type is TokenType.PLUS and {left, right} == {LoxType.STRING, LoxType.NUMBER}:
+            text = self.text
+            return lambda left, right: concatenate(text(left), text(right))
+        return None
+
+    def unary_operation(self, operator: Token, right: LoxType) -> Optional[Callable[[Any], Any]]:
+        if operator.token_type is TokenType.MINUS and right is LoxType.NUMBER:
+            return negate_number
+        if operator.token_type is TokenType.BANG and right is LoxType.BOOL:
+            return op.not_
+        return None
+
+    def evaluate(self, expr: Expr) -> Any:
+        if self.walking:
+            return expr.accept(self)
+
+        # Recursing through the tree is the faster walk, but only the
+        # explicit stack can take very deep trees.
+        self.walking = True
+        try:
+            return expr.accept(self)
+        except RecursionError:
+            pass
+        finally:
+            self.walking = False
+        return super().evaluate(expr)
+
+    def visit_unary_expr(self, expr: Unary):
+        operation = self.operations.get(id(expr.operator))
+        if operation is None:
+            return super().visit_unary_expr(expr)
+        return operation(self.evaluate(expr.right))
+
+    def visit_binary_expr(self, expr: Binary):
+        operation = self.operations.get(id(expr.operator))
+        if operation is None:
+            return super().visit_binary_expr(expr)
+        left = self.evaluate(expr.left)
+        return operation(left, self.evaluate(expr.right))
+
+    # The operators the explicit stack applies.
+
+    def unary(self, operator: Token, right: Any) -> Any:
+        operation = self.operations.get(id(operator))
+        if operation is None:
+            return super().unary(operator, right)
+        return operation(right)
+
+    def binary(self, operator: Token, left: Any, right: Any) -> Any:
+        operation = self.operations.get(id(operator))
+        if operation is None:
+            return super().binary(operator, left, right)
+        return operation(left, right)
@@ -1,65 +1,98 @@
 from math import floor
-from typing import Any, Callable, Union
+from typing import Any, Callable, Optional, Union
 
-from src.error import RuntimeException, runtime_error
-from .expr import Binary, Unary, Visitor, Literal, Expr, Grouping
+from src.error import RuntimeException, current_context, runtime_error
+from .numeric import exact, is_number, widen
+from .rope import Rope, concatenate, flatten
+from .expr import Binary, Unary, Visitor, Literal, Expr, Grouping, Variable
 from .tokens import TokenType, Token
 
 
 class Interpreter(Visitor):
+    def __init__(self, environment: Optional[dict[str, Any]] = None) -> None:
+        # The values of the variables an expression may refer to.
+        self.environment: dict[str, Any] = {} if environment is None else environment
+
     def interpret(self, expr: Expr):
         try:
             value = self.evaluate(expr)
-            print(self.stringify(value))
+            current_context().print(self.stringify(value))
         except RuntimeException as e:
             runtime_error(e)
 
     def visit_literal_expr(self, expr: Literal):
         return expr.value
 
+    def visit_variable_expr(self, expr: Variable):
+        return self.look_up(expr.name)
+
     def visit_grouping_expr(self, expr: Grouping):
         return self.evaluate(expr.expression)
     
     def visit_unary_expr(self, expr: Unary):
-        right = self.evaluate(expr.right)
+        return self.unary(expr.operator, self.evaluate(expr.right))
 
-        print(expr.operator)
-        if expr.operator.token_type is TokenType.MINUS:
-            return -float(right)
-        elif expr.operator.token_type is TokenType.BANG:
+    def visit_binary_expr(self, expr: Binary):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        return self.binary(expr.operator, left, right)
+
+    def unary(self, operator: Token, right: Any) -> Any:
+        """
+        Apply a unary operator to its evaluated operand.
+        """
+        if operator.token_type is TokenType.MINUS:
+            self.assert_numbers(operator, right)
+            if type(right) is int and right == 0:
+                # Float negation gives -0.0, which no int can stand for.
+                return -0.0
+            return -right
+        elif operator.token_type is TokenType.BANG:
             return not self.is_truthy(right)
 
         # Should not occur
-        print("AHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHHH")
         return None
 
-    def visit_binary_expr(self, expr: Binary):
-        left = self.evaluate(expr.left)
-        right = self.evaluate(expr.right)
-
-        if expr.operator.token_type is TokenType.PLUS:
-            if self.is_num_or_str(left, right):
-                if isinstance(left, str) or isinstance(right, str):
-                    return self.stringify(left) + self.stringify(right)    
+    def binary(self, operator: Token, left: Any, right: Any) -> Any:
+        """
+        Apply a binary operator to its evaluated operands.
+        """
+        if type(left) is int and type(right) is int:
+            # Both integral, so +, - and * can stay exact ints.
+            if operator.token_type is TokenType.PLUS:
+                return exact(left + right)
+            if operator.token_type is TokenType.MINUS:
+                return exact(left - right)
+            if operator.token_type is TokenType.STAR:
+                product = left * right
+                if product == 0 and (left < 0 or right < 0):
+                    return -0.0
+                return exact(product)
+
+        if operator.token_type is TokenType.PLUS:
+            if self.is_num_or_string(left, right):
+                if isinstance(left, (str, Rope)) or isinstance(right, (str, Rope)):
+                    # Ropes are concatenated as they are, not flattened.
+                    return concatenate(self.text(left), self.text(right))
                 else:
                     return left + right
 
-            raise RuntimeException("Operators must both be floats or strings.", expr.operator)
-        if expr.operator.token_type is TokenType.MINUS:
-            self.assert_numbers(expr.operator, left, right)
+            raise RuntimeException("Operators must both be floats or strings.", operator)
+        if operator.token_type is TokenType.MINUS:
+            self.assert_numbers(operator, left, right)
             return left - right
-        elif expr.operator.token_type is TokenType.STAR:
-            self.assert_numbers(expr.operator, left, right)
+        elif operator.token_type is TokenType.STAR:
+            self.assert_numbers(operator, left, right)
             return left * right
-        elif expr.operator.token_type is TokenType.SLASH:
-            self.assert_numbers(expr.operator, left, right)
+        elif operator.token_type is TokenType.SLASH:
+            self.assert_numbers(operator, left, right)
             if right == 0:
-                raise RuntimeException("Division by zero error", expr.operator)
+                raise RuntimeException("Division by zero error", operator)
             return left / right
         
         else:
             # Expression is a comparison
-            left, right = self.num_or_string(left, right)
+            left, right = self.num_or_string(flatten(left), flatten(right))
             gt = lambda x, y: x > y
             lt = lambda x, y: x < y
             eq = lambda x, y: x == y
@@ -70,22 +103,32 @@ class Interpreter(Visitor):
                 if self.is_num_or_string(left, right):
                     return operation(left, right)
                 else:
-                    raise RuntimeException(f"Comparison {expr.operator.literal} of {left} of type {type(left)} is not possible with {right} of type {type(right)}.", expr.operator)
+                    # Numbers are described as the floats they always were.
+                    shown_left, shown_right = widen(left), widen(right)
+                    raise RuntimeException(f"Comparison {operator.lexeme} of {shown_left} of type {type(shown_left)} is not possible with {shown_right} of type {type(shown_right)}.", operator)
 
-            if expr.operator.token_type is TokenType.GREATER_EQUAL:
+            if operator.token_type is TokenType.GREATER_EQUAL:
                 return compare(geq)
-            elif expr.operator.token_type is TokenType.LESS_EQUAL:
+            elif operator.token_type is TokenType.LESS_EQUAL:
                 return compare(leq)
-            elif expr.operator.token_type is TokenType.GREATER:
+            elif operator.token_type is TokenType.GREATER:
                 return compare(gt)
-            elif expr.operator.token_type is TokenType.LESS:
+            elif operator.token_type is TokenType.LESS:
                 return compare(lt)    
-            elif expr.operator.token_type is TokenType.EQUAL_EQUAL:
+            elif operator.token_type is TokenType.EQUAL_EQUAL:
                 return self.is_equal(left, right)
+            elif operator.token_type is TokenType.BANG_EQUAL:
+                return not self.is_equal(left, right)
 
         return None
 
 
+    def look_up(self, name: Token) -> Any:
+        try:
+            return self.environment[name.lexeme]
+        except KeyError:
+            raise RuntimeException(f"Undefined variable '{name.lexeme}'.", name) from None
+
     def is_truthy(self, value: Any):
         if value is None: return False
         if isinstance(value, bool): return value
@@ -97,27 +140,41 @@ class Interpreter(Visitor):
         return a == b
 
     def assert_numbers(self, operator: Token, *operands):
-        for operand in operands:
-            if isinstance(operand, float):
-                return
+        if all(is_number(operand) for operand in operands):
+            return
 
         singular = len(operands) == 1
         raise RuntimeException(f"Operand{'' if singular else 's'} must be {'a number' if singular else 'numbers'}.", operator)
 
     def num_or_string(self, *values: list[Union[int, float]]) -> list[Union[int, float]]:
         if any(isinstance(value, str) for value in values):
-            return [str(value) for value in values]
+            # Compared as text, 1 must still read as "1.0".
+            return [str(widen(value)) for value in values]
         return values
 
     def is_num_or_string(self, *values) -> bool:
-        return all(isinstance(value, (float, str)) for value in values)
+        return all(is_number(value) or isinstance(value, (str, Rope)) for value in values)
 
     def evaluate(self, expr: Expr) -> Any:
+        """
+        The value of expr, which may be a Rope where it is a string; see
+        value() for one that never is.
+        """
         return expr.accept(self)
 
+    def value(self, expr: Expr) -> Any:
+        return flatten(self.evaluate(expr))
+
+    def text(self, value: Any) -> Union[str, Rope]:
+        # As stringify, but leaving ropes as they are.
+        return value if type(value) is Rope else self.stringify(value)
+
     def stringify(self, value: Any) -> str:
         if value is None: return "nil"
 
+        if type(value) is int:
+            return str(value)
+
         if isinstance(value, float):
             # If the integer representation of a float is the same
             # as the float's rounded value, the float is an integer value.
@@ -0,0 +1,123 @@
+from typing import Any, Optional, Union
+
+from .expr import Binary, Expr, Grouping, Literal, Unary, Variable
+from .interpreter import Interpreter
+from .parser import INFIX_PRECEDENCES, Parser, Precedence
+from .tokens import Token, TokenType
+
+# Marks an open parenthesis on the parser's operator stack.
+OPEN = None
+
+# Markers, on the interpreter's stack of nodes to visit, for applying the
+# operator of the innermost Binary or Unary node whose operands are done.
+BINARY = object()
+UNARY = object()
+
+
+class IterativeParser(Parser):
+    """
+    A Parser for the same grammar which keeps its pending operators and
+    operands on explicit stacks instead of the call stack, so that however
+    deeply an expression nests, parsing takes memory in proportion to the
+    depth and never hits the recursion limit.
+
+    It consumes tokens in the same order as the recursive descent, so it
+    reports the same errors at the same tokens and, where an operand or a
+    closing parenthesis is missing, leaves the same holes in the tree.
+    """
+    def expression(self) -> Expr:
+        # Each operator is an operator token and whether it is binary, or OPEN.
+        operators: list[Optional[tuple[Token, bool]]] = []
+        operands: list[Expr] = []
+
+        while True:
+            # Prefix operators and parentheses, then an operand.
+            while True:
+                if self.match(TokenType.BANG, TokenType.MINUS):
+                    operators.append((self.previous(), False))
+                elif self.match(TokenType.LEFT_PAREN):
+                    operators.append(OPEN)
+                else:
+                    operands.append(self.primary())
+                    break
+
+            while True:
+                # A unary operator binds more tightly than any binary one.
+                while operators and operators[-1] is not OPEN and not operators[-1][1]:
+                    operands.append(Unary(operators.pop()[0], operands.pop()))
+
+                if self.peek().token_type in INFIX_PRECEDENCES:
+                    precedence = INFIX_PRECEDENCES[self.advance().token_type]
+                    self.reduce(operators, operands, precedence)
+                    operators.append((self.previous(), True))
+                    break
+
+                self.reduce(operators, operands, Precedence.NONE)
+                if not operators:
+                    return operands.pop()
+                # Inside a parenthesis, which is now complete.
+                operators.pop()
+                self.consume(TokenType.RIGHT_PAREN, "Expected ')' after '(' expression.")
+                operands.append(Grouping(operands.pop()))
+
+    def primary(self) -> Expr:
+        if self.match(TokenType.FALSE): return Literal(False)
+        if self.match(TokenType.TRUE): return Literal(True)
+        if self.match(TokenType.NIL): return Literal(None)
+
+        if self.match(TokenType.NUMBER, TokenType.STRING):
+            return Literal(self.previous().literal)
+
+        if self.match(TokenType.IDENTIFIER):
+            return Variable(self.previous())
+
+        self.error(self.peek(), "Expected expression.")
+
+    def reduce(self, operators: list[Optional[tuple[Token, bool]]], operands: list[Expr], precedence: Precedence) -> None:
+        """
+        Build the binary nodes of every operator on top of the stack that
+        binds at least as tightly as precedence, as they are left-associative.
+        """
+        while operators and operators[-1] is not OPEN and INFIX_PRECEDENCES[operators[-1][0].token_type] >= precedence:
+            right = operands.pop()
+            operands.append(Binary(operands.pop(), operators.pop()[0], right))
+
+
+class IterativeInterpreter(Interpreter):
+    """
+    An Interpreter which walks the tree with an explicit stack rather than
+    recursion, evaluating operands in the same order, so that it gives the
+    same results and raises the same errors however deep the tree is.
+    """
+    def evaluate(self, expr: Expr) -> Any:
+        # Nodes still to visit, with a marker under the operands of each
+        # Unary and Binary node for when their values are ready.
+        pending: list[Union[Expr, object]] = [expr]
+        values: list[Any] = []
+        operators: list[Union[Binary, Unary]] = []
+
+        while pending:
+            node = pending.pop()
+            kind = type(node)
+            if kind is Literal:
+                values.append(node.value)
+            elif kind is Variable:
+                values.append(self.look_up(node.name))
+            elif kind is Grouping:
+                pending.append(node.expression)
+            elif kind is Binary:
+                operators.append(node)
+                pending += (BINARY, node.right, node.left)
+            elif kind is Unary:
+                operators.append(node)
+                pending += (UNARY, node.right)
+            elif node is BINARY:
+                right = values.pop()
+                values[-1] = self.binary(operators.pop().operator, values[-1], right)
+            elif node is UNARY:
+                values[-1] = self.unary(operators.pop().operator, values[-1])
+            else:
+                values.append(node.accept(self))
+
+        return values.pop()
+
@@ -0,0 +1,141 @@
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from sys import intern
+from typing import IO, Iterator, Union
+
+from .error import error
+from .numeric import parse_number
+from .regex_scanner import RegexScanner
+from .scanner import Scanner
+from .tokens import Token, TokenType
+
+Source = Union[bytes, mmap.mmap]
+
+# How far, in bytes, the scanner gets past the pages of a mapping it last
+# released before releasing them again.
+RELEASE_EVERY = 1 << 24
+
+
+class MappedScanner(RegexScanner):
+    """
+    A scanner for UTF-8 source held as bytes, typically a memory-mapped
+    script. It matches lexemes directly in the mapping, so the source is
+    never copied into a str, and yields tokens lazily as the parser asks
+    for them, so they are never all held at once. Only the text a Token
+    needs is decoded; fixed lexemes such as operators and keywords are
+    shared rather than decoded at all. It produces the same tokens and
+    reports the same errors as RegexScanner.
+    """
+    # The same pattern as RegexScanner's, over bytes. Non-ASCII text outside
+    # strings and comments is swept into identifiers, then scanned again as
+    # text, as \s and \w only cover ASCII here.
+    PATTERN = re.compile(
+        rb"(?P<whitespace>[ \t\n\r\x0b\x0c\x1c-\x1f]+)"
+        rb"|(?P<comment>//[^\n]*)"
+        rb"|(?P<multiline_comment>/\*.*?(?:\*/|\Z))"
+        rb"|(?P<number>[0-9]+(?:\.[0-9]+)?)"
+        rb"|(?P<identifier>[A-Za-z\x80-\xff][A-Za-z0-9\x80-\xff]*)"
+        rb'|(?P<string>"[^"]*"?)'
+        rb"|(?P<operator>[!=<>]=?|[-+*/(){},.;])"
+        rb"|(?P<unexpected>.)",
+        re.DOTALL
+    )
+
+    # Operators and keywords, with the lexeme each of their tokens shares.
+    FIXED_LEXEMES = {
+        **{lexeme.encode(): (token_type, lexeme) for lexeme, token_type in RegexScanner.OPERATORS.items()},
+        **{lexeme.encode(): (token_type, lexeme) for lexeme, token_type in Scanner.KEYWORDS.items()},
+    }
+
+    def __init__(self, source: Source) -> None:
+        super().__init__("")
+        self.data = source
+
+    def scan_tokens(self) -> list[Token]:
+        self.tokens.extend(self.scan())
+        return self.tokens
+
+    def scan(self) -> Iterator[Token]:
+        """
+        Yield the tokens of the source one at a time, ending with EOF.
+        """
+        data = self.data
+        length = len(data)
+        finditer = self.PATTERN.finditer
+        fixed = self.FIXED_LEXEMES
+        line = self.line
+        current = 0
+        # Pages of a mapping that have been scanned are handed back as the
+        # scan goes, so that they do not count towards the resident size.
+        # They stay in the page cache, should anything read them again.
+        releasing = isinstance(data, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED")
+        release_at = RELEASE_EVERY if releasing else length + 1
+
+        while current < length:
+            for m in finditer(data, current):
+                kind = m.lastgroup
+                if m.start() >= release_at:
+                    data.madvise(mmap.MADV_DONTNEED, 0, m.start() - m.start() % mmap.PAGESIZE)
+                    release_at = m.start() + RELEASE_EVERY
+
+                if kind == "whitespace" or kind == "multiline_comment":
+                    line += m.group().count(b"\n")
+                elif kind == "operator":
+                    token_type, lexeme = fixed[m.group()]
+                    yield Token(token_type, lexeme, None, line)
+                elif kind == "number":
+                    lexeme = m.group().decode("ascii")
+                    yield Token(TokenType.NUMBER, lexeme, parse_number(lexeme), line)
+                elif kind == "identifier":
+                    text = m.group()
+                    if text.isascii():
+                        token_type, lexeme = fixed.get(text, (TokenType.IDENTIFIER, None))
+                        yield Token(token_type, lexeme or intern(text.decode("ascii")), None, line)
+                        continue
+
+                    # Rare enough to hand to the text scanner. Whatever it
+                    # finds ends with the span, except that digits at the end
+                    # may be a number carrying on past it, so those are
+                    # scanned again from here.
+                    scanner = RegexScanner("")
+                    scanner.line = line
+                    tokens = list(scanner.lex(text.decode("utf-8")))
+                    line = scanner.line
+                    if tokens and tokens[-1].token_type is TokenType.NUMBER and text[-1:].isdigit():
+                        yield from tokens[:-1]
+                        current = m.end() - len(tokens[-1].lexeme)
+                        break
+                    yield from tokens
+                elif kind == "string":
+                    text = m.group().decode("utf-8")
+                    line += text.count("\n")
+                    if len(text) > 1 and text[-1] == '"':
+                        yield Token(TokenType.STRING, text, text[1:-1], line)
+                    else:
+                        error(line, "Unterminated string.")
+                elif kind == "unexpected":
+                    error(line, "Unexpected character.")
+            else:
+                current = length
+
+        self.line = line
+        yield Token(TokenType.EOF, "", None, line)
+
+
+@contextmanager
+def map_file(file: IO) -> Iterator[Source]:
+    """
+    Map the whole of an open file into memory, read-only, for as long as
+    the context lasts. Empty files cannot be mapped, so they give b"".
+    """
+    if os.fstat(file.fileno()).st_size == 0:
+        yield b""
+        return
+
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            # Let the kernel read ahead of the scanner.
+            mapping.madvise(mmap.MADV_SEQUENTIAL)
+        yield mapping
@@ -0,0 +1,137 @@
+import gc
+import os
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Any, ContextManager, Iterator, Optional, TextIO
+
+# How many allocation sites and object types are kept for each stage.
+TOP = 10
+
+# Allocations made by tracemalloc itself, and by this module, are not the
+# pipeline's.
+IGNORED = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+@dataclass
+class AllocationSite:
+    file: str
+    line: int
+    # What the stage left allocated at this line: bytes and memory blocks.
+    size: int
+    count: int
+
+
+@dataclass
+class StageMemory:
+    name: str
+    # The most memory allocated at once during the stage, over what was
+    # allocated when it began.
+    peak_bytes: int = 0
+    # Memory still allocated when the stage ended, over what was allocated
+    # when it began: what it left behind for the stages after it.
+    retained_bytes: int = 0
+    sites: list[AllocationSite] = field(default_factory=list)
+    # How many more live objects of each type there were when the stage
+    # ended than when it began, most first. Only objects the garbage
+    # collector tracks are counted: Tokens and nodes are, but strs, ints and
+    # floats are not.
+    objects: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class MemoryProfile:
+    """
+    The memory each stage of one run of the pipeline allocated, as traced
+    by tracemalloc. Stages are named as the phases of RunMetrics are.
+    Tracing must have been started (see start) before the run.
+    """
+    script: Optional[str] = None
+    characters: int = 0
+    tokens: int = 0
+    nodes: int = 0
+    stages: list[StageMemory] = field(default_factory=list)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        # Garbage from earlier stages would otherwise be collected, and
+        # counted against, whichever stage happened to trigger a collection.
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        # Counted between the snapshots, so that the profiler's own objects
+        # cancel out, but for the counts themselves, which are left out of
+        # the counts at the end.
+        objects = count_objects()
+        tracemalloc.reset_peak()
+        started = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            counts = count_objects(objects)
+            after = tracemalloc.take_snapshot()
+
+            stage = StageMemory(name, peak - started, current - started)
+            growth = [(name, count - objects.get(name, 0)) for name, count in counts.items()]
+            stage.objects = dict(sorted((item for item in growth if item[1] > 0), key=lambda item: item[1], reverse=True)[:TOP])
+            for difference in after.filter_traces(IGNORED).compare_to(before.filter_traces(IGNORED), "lineno")[:TOP]:
+                if difference.size_diff <= 0:
+                    break
+                frame = difference.traceback[0]
+                stage.sites.append(AllocationSite(relative(frame.filename), frame.lineno, difference.size_diff, difference.count_diff))
+            self.stages.append(stage)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    def report(self, out: TextIO) -> None:
+        print(f"memory profile of {self.script or 'input'}: {self.characters} characters, {self.tokens} tokens, {self.nodes} nodes", file=out)
+        print(f"{'stage':<12}{'peak KB':>12}{'retained KB':>14}", file=out)
+        for stage in self.stages:
+            print(f"{stage.name:<12}{stage.peak_bytes / 1e3:>12.1f}{stage.retained_bytes / 1e3:>14.1f}", file=out)
+
+        for stage in self.stages:
+            print(f"\n{stage.name}", file=out)
+            for site in stage.sites:
+                print(f"  {site.file + ':' + str(site.line):<40}{site.size / 1e3:>12.1f} KB{site.count:>10} blocks", file=out)
+            for name, count in stage.objects.items():
+                print(f"  {name:<40}{count:>+12}", file=out)
+
+
+def count_objects(*ignored: Any) -> dict[str, int]:
+    """
+    The number of live objects of each type the garbage collector tracks,
+    other than those ignored.
+    """
+    # The tuple of them too, which is itself tracked.
+    skipped = {id(ignored), *map(id, ignored)}
+    counts: dict[str, int] = {}
+    for obj in gc.get_objects():
+        if id(obj) in skipped:
+            continue
+        name = type(obj).__name__
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def relative(path: str) -> str:
+    """
+    The path relative to the working directory, if it is beneath it.
+    """
+    relative = os.path.relpath(path)
+    return path if relative.startswith("..") else relative
+
+
+def start() -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def stage(profile: Optional[MemoryProfile], name: str) -> ContextManager:
+    """
+    Profile a stage into profile, or do nothing if there is none.
+    """
+    return nullcontext() if profile is None else profile.stage(name)
@@ -0,0 +1,89 @@
+import sys
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from time import perf_counter
+from typing import Any, Callable, ContextManager, Iterable, Iterator, Optional
+
+from .tokens import Token
+
+
+@dataclass
+class PhaseMetrics:
+    seconds: float = 0.0
+    # The change in the number of memory blocks allocated by Python over the
+    # phase: roughly, how many objects it left behind.
+    allocated_blocks: int = 0
+
+
+@dataclass
+class RunMetrics:
+    """
+    Measurements of one run of the pipeline, passed to every metrics hook
+    when the run ends. Phases are named "scan", "parse", "load" (from the
+    parse cache), "typecheck", "optimize", "intern" (for --cse) and
+    "interpret", and only those the run went through are present. When a
+    script is streamed, scanning happens as the parser asks for tokens, so
+    it is timed as part of "parse". Trees loaded from the cache are not
+    scanned, so their token count is 0. A memory-mapped script is scanned
+    as bytes, so its characters are counted in bytes.
+    """
+    script: Optional[str] = None
+    characters: int = 0
+    tokens: int = 0
+    nodes: int = 0
+    max_depth: int = 0
+    syntax_error: bool = False
+    runtime_error: bool = False
+    phases: dict[str, PhaseMetrics] = field(default_factory=dict)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        blocks = sys.getallocatedblocks()
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = PhaseMetrics(perf_counter() - started, sys.getallocatedblocks() - blocks)
+
+    def count_characters(self, chunks: Iterable[str]) -> Iterator[str]:
+        for chunk in chunks:
+            self.characters += len(chunk)
+            yield chunk
+
+    def count_tokens(self, tokens: Iterable[Token]) -> Iterator[Token]:
+        for token in tokens:
+            self.tokens += 1
+            yield token
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+MetricsHook = Callable[[RunMetrics], None]
+
+hooks: list[MetricsHook] = []
+
+def add_hook(hook: MetricsHook) -> None:
+    """
+    Call hook with the RunMetrics of every run from now on. Metrics are
+    only gathered while there is at least one hook.
+    """
+    if hook not in hooks:
+        hooks.append(hook)
+
+def remove_hook(hook: MetricsHook) -> None:
+    if hook in hooks:
+        hooks.remove(hook)
+
+def enabled() -> bool:
+    return bool(hooks)
+
+def report(metrics: RunMetrics) -> None:
+    for hook in hooks:
+        hook(metrics)
+
+def phase(metrics: Optional[RunMetrics], name: str) -> ContextManager:
+    """
+    Time a phase into metrics, or do nothing if there are none.
+    """
+    return nullcontext() if metrics is None else metrics.phase(name)
@@ -0,0 +1,48 @@
+"""
+Lox has a single number type, whose values have always been Python floats.
+Integral values may instead be held as Python ints, which are cheaper to
+add, multiply and print, as long as every result is the one float
+arithmetic would give. Ints are kept within MAX_EXACT, where every integer
+is exactly a float, so their sums, differences and products are exact
+exactly when the float ones are; anything larger is rounded to a float,
+the same float the float operation would have rounded to.
+"""
+from typing import Any, Union
+
+Number = Union[int, float]
+
+MAX_EXACT = 2 ** 53
+
+
+def parse_number(text: str) -> Number:
+    """
+    The value of a number literal: an int if it has no fractional part and
+    is exactly a float, otherwise a float.
+    """
+    if "." in text:
+        return float(text)
+    # Literals are never negative.
+    value = int(text)
+    return value if value <= MAX_EXACT else float(value)
+
+
+def exact(value: int) -> Number:
+    """
+    An int result, rounded to a float if it is too large to be exact.
+    """
+    if -MAX_EXACT <= value <= MAX_EXACT:
+        return value
+    return float(value)
+
+
+def widen(value: Any) -> Any:
+    """
+    The value as a float if it is an int, for code that only knows floats
+    or that shows numbers as floats do.
+    """
+    return float(value) if type(value) is int else value
+
+
+def is_number(value: Any) -> bool:
+    # bool is a subclass of int, but not a number in Lox.
+    return type(value) is float or type(value) is int
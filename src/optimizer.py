@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from .error import RuntimeException
+from .expr import Binary, Expr, Grouping, Literal, NodeCounter, PostOrder, Unary, Variable, Visitor
+from .interpreter import Interpreter
+from .numeric import is_number
+from .tokens import TokenType
+
+
+@dataclass
+class OptimizerStats:
+    nodes_before: int = 0
+    nodes_after: int = 0
+    constants_folded: int = 0
+    groupings_removed: int = 0
+    negations_removed: int = 0
+
+    @property
+    def nodes_eliminated(self) -> int:
+        return self.nodes_before - self.nodes_after
+
+    def __str__(self) -> str:
+        return (
+            f"Optimizer: {self.nodes_before} -> {self.nodes_after} nodes "
+            f"({self.nodes_eliminated} eliminated: {self.constants_folded} folded, "
+            f"{self.groupings_removed} groupings, {self.negations_removed} negations)"
+        )
+
+
+class Optimizer(Visitor):
+    """
+    Rewrites an expression tree into a cheaper one which evaluates to the
+    same value. Subtrees made only of literals are folded into a single
+    literal, groupings are dropped (the tree already encodes precedence)
+    and double negations are removed where that cannot change the result.
+
+    Nothing which would raise a RuntimeException is folded; it is left in
+    place to raise, with its original token, when the program is run.
+    """
+    # Unary or binary operators whose result, if they produce one, is always a bool.
+    BOOLEAN_OPERATORS = (
+        TokenType.BANG,
+        TokenType.EQUAL_EQUAL,
+        TokenType.BANG_EQUAL,
+        TokenType.GREATER,
+        TokenType.GREATER_EQUAL,
+        TokenType.LESS,
+        TokenType.LESS_EQUAL,
+    )
+
+    # Unary or binary operators whose result, if they produce one, is always a number.
+    NUMBER_OPERATORS = (
+        TokenType.MINUS,
+        TokenType.STAR,
+        TokenType.SLASH,
+    )
+
+    def __init__(self, interpreter: Optional[Interpreter] = None) -> None:
+        # Folding evaluates through a real interpreter, so that folded values
+        # are exactly those the program would have computed.
+        self.interpreter = interpreter or Interpreter()
+        self.stats = OptimizerStats()
+
+    def optimize(self, expr: Expr) -> Expr:
+        counter = NodeCounter()
+        self.stats.nodes_before += counter.count(expr)
+        # Long chains of operators make deep trees, so rather than recursing,
+        # the nodes are rewritten children first, each visit taking the
+        # rewritten children from a stack of results.
+        self.results: list[Expr] = []
+        for node in PostOrder().walk(expr):
+            self.results.append(node.accept(self))
+        expr = self.results.pop()
+        self.stats.nodes_after += counter.count(expr)
+        return expr
+
+    def visit_literal_expr(self, expr: Literal):
+        return expr
+
+    def visit_variable_expr(self, expr: Variable):
+        return expr
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.stats.groupings_removed += 1
+        return self.results.pop()
+
+    def visit_unary_expr(self, expr: Unary):
+        right = self.results.pop()
+
+        if isinstance(right, Unary) and right.operator.token_type is expr.operator.token_type:
+            inner = right.right
+            if (
+                expr.operator.token_type is TokenType.BANG and self.is_boolean(inner)
+                or expr.operator.token_type is TokenType.MINUS and self.is_number(inner)
+            ):
+                self.stats.negations_removed += 2
+                return inner
+
+        return self.fold(Unary(expr.operator, right), right)
+
+    def visit_binary_expr(self, expr: Binary):
+        right = self.results.pop()
+        left = self.results.pop()
+        return self.fold(Binary(left, expr.operator, right), left, right)
+
+    def fold(self, expr: Expr, *operands: Expr) -> Expr:
+        if not all(isinstance(operand, Literal) for operand in operands):
+            return expr
+
+        try:
+            value = self.interpreter.value(expr)
+        except RuntimeException:
+            return expr
+
+        self.stats.constants_folded += 1
+        return Literal(value)
+
+    def is_boolean(self, expr: Expr) -> bool:
+        if isinstance(expr, Literal):
+            return isinstance(expr.value, bool)
+        if isinstance(expr, (Unary, Binary)):
+            return expr.operator.token_type in self.BOOLEAN_OPERATORS
+        return False
+
+    def is_number(self, expr: Expr) -> bool:
+        if isinstance(expr, Literal):
+            return is_number(expr.value)
+        if isinstance(expr, (Unary, Binary)):
+            return expr.operator.token_type in self.NUMBER_OPERATORS
+        return False
@@ -1,19 +1,35 @@
-from typing import Union
+from enum import IntEnum
+from typing import Callable, Iterable, Union
 from .tokens import Token, TokenType
-from .expr import Expr, Binary, Literal, Unary, Grouping
+from .expr import Expr, Binary, Literal, Unary, Grouping, Variable
 from .error import error
 
 class ParseError(Exception):
     pass
 
+class Precedence(IntEnum):
+    """
+    How tightly each level of the grammar binds its operands, loosest first.
+    """
+    NONE = 0
+    EQUALITY = 1
+    COMPARISON = 2
+    TERM = 3
+    FACTOR = 4
+    UNARY = 5
+
+
 class Parser:
     """
-    A recursive decent parser, which takes in a flat list of tokens generated
+    A Pratt parser, which takes in a flat sequence of tokens generated
     by a lexer, converting them into a semantically gravid structure.
+    Tokens are pulled from the sequence one at a time, so it may just as well
+    be a lazy iterator as a list.
     """
-    def __init__(self, tokens: list[Token]) -> None:
-        self.tokens = tokens
-        self.current: int = 0
+    def __init__(self, tokens: Iterable[Token]) -> None:
+        self.tokens = iter(tokens)
+        self.current_token: Token = next(self.tokens)
+        self.previous_token: Token = None
 
     def parse(self) -> Union[Expr, None]:
         try:
@@ -31,76 +47,70 @@ class Parser:
         unary          → ( "!" | "-" ) unary
                     | primary ;
         primary        → NUMBER | STRING | "true" | "false" | "nil"
-                    | "(" expression ")" ;
+                    | IDENTIFIER | "(" expression ")" ;
     """
+    # Rather than a method per level, each token type which can start an
+    # expression has a prefix rule, and each binary operator a precedence
+    # (see PREFIX_RULES and INFIX_PRECEDENCES, below). Adding a level only
+    # means adding to those tables.
 
     def expression(self) -> Expr:
-        return self.equality()
+        return self.parse_precedence(Precedence.EQUALITY)
 
     def equality(self) -> Expr:
-        expr: Expr = self.comparison()
-
-        while self.match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
-            operator: Token = self.previous()
-            right: Expr = self.comparison()
-            expr = Binary(expr, operator, right)
-
-        return expr
+        return self.parse_precedence(Precedence.EQUALITY)
 
     def comparison(self) -> Expr:
-        expr: Expr = self.term()
-
-        while self.match(TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL):
-            operator: Token = self.previous()
-            right: Expr = self.term()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
+        return self.parse_precedence(Precedence.COMPARISON)
 
     def term(self) -> Expr:
-        expr: Expr = self.factor()
-
-        while self.match(TokenType.PLUS, TokenType.MINUS):
-            operator: Token = self.previous()
-            right: Expr = self.factor()
-            expr = Binary(expr, operator, right)
-
-        return expr
+        return self.parse_precedence(Precedence.TERM)
 
     def factor(self) -> Expr:
-        expr: Expr = self.unary()
+        return self.parse_precedence(Precedence.FACTOR)
 
-        while self.match(TokenType.SLASH, TokenType.STAR):
-            operator: Token = self.previous()
-            right: Expr = self.unary()
+    def unary(self) -> Expr:
+        return self.parse_precedence(Precedence.UNARY)
+
+    def parse_precedence(self, precedence: Precedence) -> Expr:
+        """
+        Parse an expression whose binary operators all bind at least as
+        tightly as precedence.
+        """
+        token = self.current_token
+        prefix = PREFIX_RULES.get(token.token_type)
+        if prefix is None:
+            self.error(token, "Expected expression.")
+            expr = None
+        else:
+            self.advance()
+            expr = prefix(self, token)
+
+        # Operators of equal precedence are left-associative, so the right
+        # operand may only hold operators binding more tightly.
+        while INFIX_PRECEDENCES.get(self.current_token.token_type, Precedence.NONE) >= precedence:
+            operator: Token = self.advance()
+            right: Expr = self.parse_precedence(INFIX_PRECEDENCES[operator.token_type] + 1)
             expr = Binary(expr, operator, right)
 
         return expr
 
-    def unary(self) -> Expr:
-        if self.match(TokenType.BANG, TokenType.MINUS):
-            operator: Token = self.previous()
-            right: Expr = self.unary()
-            return Unary(operator, right)
-        
-        return self.primary()
-    
-    def primary(self) -> Expr:
-        if self.match(TokenType.FALSE): return Literal(False)
-        if self.match(TokenType.TRUE): return Literal(True)
-        if self.match(TokenType.NIL): return Literal(None)
-        
-        if self.match(TokenType.NUMBER, TokenType.STRING):
-            return Literal(self.previous().literal)
+    def keyword(self, token: Token) -> Expr:
+        return Literal(KEYWORD_VALUES[token.token_type])
+
+    def literal(self, token: Token) -> Expr:
+        return Literal(token.literal)
 
-        if self.match(TokenType.LEFT_PAREN):
-            expr: Expr = self.expression()
-            self.consume(TokenType.RIGHT_PAREN, "Expected ')' after '(' expression.")
-            return Grouping(expr)
+    def variable(self, token: Token) -> Expr:
+        return Variable(token)
 
-        self.error(self.peek(), "Expected expression.")
+    def grouping(self, token: Token) -> Expr:
+        expr: Expr = self.expression()
+        self.consume(TokenType.RIGHT_PAREN, "Expected ')' after '(' expression.")
+        return Grouping(expr)
 
+    def prefix_operator(self, token: Token) -> Expr:
+        return Unary(token, self.parse_precedence(Precedence.UNARY))
 
     def match(self, *token_types: TokenType) -> bool:
         for token_type in token_types:
@@ -116,17 +126,18 @@ class Parser:
 
     def advance(self):
         if not self.at_end():
-            self.current += 1
+            self.previous_token = self.current_token
+            self.current_token = next(self.tokens)
         return self.previous()
 
     def at_end(self) -> bool:
         return self.peek().token_type is TokenType.EOF
 
     def peek(self) -> Token:
-        return self.tokens[self.current]
+        return self.current_token
     
     def previous(self) -> Token:
-        return self.tokens[self.current-1]
+        return self.previous_token
 
     def consume(self, token_type: TokenType, message: str) -> Token:
         if self.check(token_type): return self.advance()
@@ -164,4 +175,38 @@ class Parser:
                 TokenType.RETURN
             ): return
         
-            self.advance()
\ No newline at end of file
+            self.advance()
+
+
+KEYWORD_VALUES = {
+    TokenType.FALSE: False,
+    TokenType.TRUE: True,
+    TokenType.NIL: None,
+}
+
+# How to parse an expression starting with each token type, given that token.
+PREFIX_RULES: dict[TokenType, Callable[[Parser, Token], Expr]] = {
+    TokenType.FALSE: Parser.keyword,
+    TokenType.TRUE: Parser.keyword,
+    TokenType.NIL: Parser.keyword,
+    TokenType.NUMBER: Parser.literal,
+    TokenType.STRING: Parser.literal,
+    TokenType.IDENTIFIER: Parser.variable,
+    TokenType.LEFT_PAREN: Parser.grouping,
+    TokenType.BANG: Parser.prefix_operator,
+    TokenType.MINUS: Parser.prefix_operator,
+}
+
+# The precedence of each binary operator.
+INFIX_PRECEDENCES: dict[TokenType, Precedence] = {
+    TokenType.BANG_EQUAL: Precedence.EQUALITY,
+    TokenType.EQUAL_EQUAL: Precedence.EQUALITY,
+    TokenType.GREATER: Precedence.COMPARISON,
+    TokenType.GREATER_EQUAL: Precedence.COMPARISON,
+    TokenType.LESS: Precedence.COMPARISON,
+    TokenType.LESS_EQUAL: Precedence.COMPARISON,
+    TokenType.MINUS: Precedence.TERM,
+    TokenType.PLUS: Precedence.TERM,
+    TokenType.SLASH: Precedence.FACTOR,
+    TokenType.STAR: Precedence.FACTOR,
+}
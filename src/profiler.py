@@ -0,0 +1,145 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from time import perf_counter_ns
+from typing import Any, Optional, TextIO
+
+from .expr import Binary, Expr, Unary, Variable
+from .interpreter import Interpreter
+
+# A node is profiled under its type (and operator, if it has one) and the
+# line it is on.
+Key = tuple[str, int]
+
+
+@dataclass
+class NodeStats:
+    label: str
+    line: int
+    calls: int = 0
+    # Nanoseconds spent in the node, with and without its children.
+    total: int = 0
+    self: int = 0
+
+    def add(self, other: "NodeStats") -> None:
+        self.calls += other.calls
+        self.total += other.total
+        self.self += other.self
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    An Interpreter which times every node it evaluates, recording call
+    counts and total and self time per node type and operator, on each
+    source line, as well as the self time of each distinct stack of nodes
+    for a flame graph.
+
+    Literals and groupings have no token of their own, so they are
+    attributed to the line of the nearest enclosing node that does; at the
+    root of an expression, their line is 0.
+    """
+    def __init__(self, environment: Optional[dict[str, Any]] = None) -> None:
+        super().__init__(environment)
+        self.reset()
+
+    def reset(self) -> None:
+        self.stats: dict[Key, NodeStats] = {}
+        # Stacks of nodes are stored as a tree of frames, each being its
+        # parent frame and key, so that pushing a node costs a single lookup
+        # however deep the stack is. Frame 0 is the root.
+        self.frame_ids: dict[tuple[int, Key], int] = {}
+        self.frames: list[tuple[int, Optional[Key]]] = [(-1, None)]
+        self.frame_self: list[int] = [0]
+        self.frame = 0
+        self.line = 0
+        self.children = 0
+        # How many evaluations of each key are in progress, so that time in
+        # a node nested in another of the same key is only counted once.
+        self.active: defaultdict[Key, int] = defaultdict(int)
+
+    def describe(self, expr: Expr) -> Key:
+        if isinstance(expr, (Binary, Unary)):
+            return f"{type(expr).__name__} {expr.operator.token_type.name}", expr.operator.line
+        if isinstance(expr, Variable):
+            return "Variable", expr.name.line
+        return type(expr).__name__, self.line
+
+    def evaluate(self, expr: Expr) -> Any:
+        key = self.describe(expr)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = NodeStats(*key)
+
+        parent_frame, parent_line, siblings = self.frame, self.line, self.children
+        frame = self.frame_ids.get((parent_frame, key))
+        if frame is None:
+            frame = self.frame_ids[(parent_frame, key)] = len(self.frames)
+            self.frames.append((parent_frame, key))
+            self.frame_self.append(0)
+        self.frame, self.line, self.children = frame, key[1], 0
+        self.active[key] += 1
+
+        started = perf_counter_ns()
+        try:
+            return expr.accept(self)
+        finally:
+            elapsed = perf_counter_ns() - started
+            self.active[key] -= 1
+            stats.calls += 1
+            stats.self += elapsed - self.children
+            if not self.active[key]:
+                stats.total += elapsed
+            self.frame_self[frame] += elapsed - self.children
+            self.frame, self.line, self.children = parent_frame, parent_line, siblings + elapsed
+
+    def by_node(self) -> list[NodeStats]:
+        """
+        The statistics of each node type and operator, over all lines.
+        """
+        nodes: dict[str, NodeStats] = {}
+        for stats in self.stats.values():
+            nodes.setdefault(stats.label, NodeStats(stats.label, 0)).add(stats)
+        # Totals cannot be summed across lines when nodes of the same label
+        # nest across them, so the largest is the best lower bound.
+        for label, node in nodes.items():
+            node.total = max(stats.total for stats in self.stats.values() if stats.label == label)
+        return sorted(nodes.values(), key=lambda stats: stats.self, reverse=True)
+
+    def report(self, out: TextIO) -> None:
+        elapsed = sum(stats.self for stats in self.stats.values()) or 1
+
+        def table(title: str, rows: list[NodeStats], show_line: bool) -> None:
+            print(f"{title:<24}{'line':>6}{'calls':>10}{'total ms':>11}{'self ms':>11}{'self %':>8}", file=out)
+            for stats in rows:
+                line = str(stats.line or "-") if show_line else ""
+                print(
+                    f"{stats.label:<24}{line:>6}{stats.calls:>10}{stats.total / 1e6:>11.3f}"
+                    f"{stats.self / 1e6:>11.3f}{stats.self / elapsed:>8.1%}",
+                    file=out
+                )
+
+        table("node", self.by_node(), False)
+        print(file=out)
+        table("node by line", sorted(self.stats.values(), key=lambda stats: stats.self, reverse=True), True)
+
+    def write_collapsed(self, out: TextIO) -> None:
+        """
+        Write the self time, in nanoseconds, of every stack of nodes in the
+        collapsed format read by flamegraph.pl and most other flame graph
+        tools.
+        """
+        children: list[list[int]] = [[] for _ in self.frames]
+        for frame in range(1, len(self.frames)):
+            children[self.frames[frame][0]].append(frame)
+
+        # Only the names along the current path are kept, as deep trees have
+        # very long stacks.
+        path: list[str] = []
+        pending = [(frame, 0) for frame in reversed(children[0])]
+        while pending:
+            frame, depth = pending.pop()
+            label, line = self.frames[frame][1]
+            del path[depth:]
+            path.append(f"{label}:{line}")
+            if self.frame_self[frame]:
+                out.write(f"{';'.join(path)} {self.frame_self[frame]}\n")
+            pending += ((child, depth + 1) for child in reversed(children[frame]))
@@ -0,0 +1,201 @@
+import ast
+import operator as op
+from typing import Any, Callable, Optional
+
+from .error import RuntimeException
+from .expr import Binary, Expr, Grouping, Literal, Unary, Variable, Visitor
+from .interpreter import Interpreter
+from .iterative import IterativeInterpreter
+from .numeric import widen
+from .tokens import Token, TokenType
+
+
+class Runtime:
+    """
+    The helpers compiled code calls into, whenever its operands are not the
+    plain numbers it handles inline. Each one either implements the rest of
+    Lox's semantics for the operator or raises the RuntimeException the
+    interpreter would have, on the operator's own token.
+    """
+    def __init__(self, interpreter: Interpreter) -> None:
+        self.stringify = interpreter.stringify
+        self.look_up = interpreter.look_up
+
+    def add(self, a: Any, b: Any, token: Token) -> Any:
+        if type(a) in (float, str) and type(b) in (float, str):
+            return self.stringify(a) + self.stringify(b)
+        raise RuntimeException("Operators must both be floats or strings.", token)
+
+    def arithmetic(self, a: Any, b: Any, token: Token) -> Any:
+        raise RuntimeException("Operands must be numbers.", token)
+
+    def divide(self, a: Any, b: Any, token: Token) -> Any:
+        if type(a) is not float or type(b) is not float:
+            raise RuntimeException("Operands must be numbers.", token)
+        raise RuntimeException("Division by zero error", token)
+
+    def compare(self, a: Any, b: Any, token: Token, operation: Callable[[Any, Any], bool]) -> bool:
+        if type(a) is str or type(b) is str:
+            return operation(str(a), str(b))
+        raise RuntimeException(f"Comparison {token.lexeme} of {a} of type {type(a)} is not possible with {b} of type {type(b)}.", token)
+
+    def equal(self, a: Any, b: Any) -> bool:
+        if type(a) is str or type(b) is str:
+            a, b = str(a), str(b)
+        if a is None:
+            return b is None
+        return a == b
+
+    def negate(self, a: Any, token: Token) -> Any:
+        raise RuntimeException("Operand must be a number.", token)
+
+
+class PythonCompiler(Visitor):
+    """
+    Lowers an expression tree to a Python ast, which CPython then compiles
+    into an ordinary function. Number-only operations are emitted inline,
+    guarded by type checks; anything else calls into Runtime.
+
+    Every operand is stored in its own local with ":=", so that both sides
+    of a binary operator are always evaluated (and so raise) in the same
+    order as in the interpreter, before the operator itself is checked.
+    """
+    COMPARISONS = {
+        TokenType.GREATER: (ast.Gt, op.gt),
+        TokenType.GREATER_EQUAL: (ast.GtE, op.ge),
+        TokenType.LESS: (ast.Lt, op.lt),
+        TokenType.LESS_EQUAL: (ast.LtE, op.le),
+    }
+
+    ARITHMETIC = {
+        TokenType.PLUS: (ast.Add, "add"),
+        TokenType.MINUS: (ast.Sub, "arithmetic"),
+        TokenType.STAR: (ast.Mult, "arithmetic"),
+    }
+
+    def __init__(self, interpreter: Optional[Interpreter] = None) -> None:
+        self.runtime = Runtime(interpreter or Interpreter())
+        self.constants: list[Any] = []
+        # Temporaries are reused once the operator they were made for is done
+        # with them, so only as many exist as the tree is deep.
+        self.depth = 0
+
+    def compile(self, expr: Expr) -> Callable[[], Any]:
+        body = expr.accept(self)
+        function = ast.FunctionDef(
+            name="lox_expression",
+            args=ast.arguments(posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]),
+            body=[ast.Return(body)],
+            decorator_list=[],
+        )
+        module = ast.fix_missing_locations(ast.Module(body=[function], type_ignores=[]))
+
+        namespace = {"runtime": self.runtime, "constants": tuple(self.constants)}
+        exec(compile(module, "<lox>", "exec"), namespace)
+        return namespace["lox_expression"]
+
+    def visit_literal_expr(self, expr: Literal):
+        # The generated code only knows float numbers.
+        return ast.Constant(widen(expr.value))
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return expr.expression.accept(self)
+
+    def visit_variable_expr(self, expr: Variable):
+        return self.located(self.call("look_up", self.constant(expr.name)), expr.name)
+
+    def visit_unary_expr(self, expr: Unary):
+        right = expr.right.accept(self)
+        value, store = self.temporary(self.depth)
+        right = ast.NamedExpr(store, right)
+
+        if expr.operator.token_type is TokenType.BANG:
+            # (t := right) is None or t is False
+            return ast.BoolOp(ast.Or(), [
+                ast.Compare(right, [ast.Is()], [ast.Constant(None)]),
+                ast.Compare(value, [ast.Is()], [ast.Constant(False)]),
+            ])
+
+        # -t if type(t := right) is float else runtime.negate(t, token)
+        return self.located(ast.IfExp(
+            self.is_float(right),
+            ast.UnaryOp(ast.USub(), value),
+            self.call("negate", value, self.constant(expr.operator)),
+        ), expr.operator)
+
+    def visit_binary_expr(self, expr: Binary):
+        left = expr.left.accept(self)
+        a, store_a = self.temporary(self.depth)
+        # The right operand must not overwrite the left one while it runs.
+        self.depth += 1
+        right = expr.right.accept(self)
+        self.depth -= 1
+        b, store_b = self.temporary(self.depth + 1)
+        left = ast.NamedExpr(store_a, left)
+        right = ast.NamedExpr(store_b, right)
+        token = self.constant(expr.operator)
+        token_type = expr.operator.token_type
+
+        # "&" rather than "and", as both operands must always be evaluated.
+        both_floats = ast.BinOp(self.is_float(left), ast.BitAnd(), self.is_float(right))
+
+        if token_type in self.ARITHMETIC:
+            operator, helper = self.ARITHMETIC[token_type]
+            fast = ast.BinOp(a, operator(), b)
+            slow = self.call(helper, a, b, token)
+        elif token_type is TokenType.SLASH:
+            both_floats = ast.BoolOp(ast.And(), [both_floats, ast.Compare(b, [ast.NotEq()], [ast.Constant(0.0)])])
+            fast = ast.BinOp(a, ast.Div(), b)
+            slow = self.call("divide", a, b, token)
+        elif token_type in self.COMPARISONS:
+            operator, operation = self.COMPARISONS[token_type]
+            fast = ast.Compare(a, [operator()], [b])
+            slow = self.call("compare", a, b, token, self.constant(operation))
+        else:
+            fast = ast.Compare(a, [ast.Eq()], [b])
+            slow = self.call("equal", a, b)
+            if token_type is TokenType.BANG_EQUAL:
+                fast = ast.UnaryOp(ast.Not(), fast)
+                slow = ast.UnaryOp(ast.Not(), slow)
+
+        return self.located(ast.IfExp(both_floats, fast, slow), expr.operator)
+
+    def temporary(self, slot: int) -> tuple[ast.Name, ast.Name]:
+        name = f"t{slot}"
+        return ast.Name(name, ast.Load()), ast.Name(name, ast.Store())
+
+    def constant(self, value: Any) -> ast.expr:
+        # Tokens and functions cannot be ast constants, so they are looked up
+        # in a tuple handed to the compiled code instead.
+        self.constants.append(value)
+        return ast.Subscript(ast.Name("constants", ast.Load()), ast.Constant(len(self.constants) - 1), ast.Load())
+
+    def call(self, helper: str, *args: ast.expr) -> ast.expr:
+        function = ast.Attribute(ast.Name("runtime", ast.Load()), helper, ast.Load())
+        return ast.Call(function, list(args), [])
+
+    def is_float(self, value: ast.expr) -> ast.expr:
+        kind = ast.Call(ast.Name("type", ast.Load()), [value], [])
+        return ast.Compare(kind, [ast.Is()], [ast.Name("float", ast.Load())])
+
+    def located(self, node: ast.expr, token: Token) -> ast.expr:
+        # Point Python's own tracebacks at the Lox line, too.
+        node.lineno = node.end_lineno = token.line
+        node.col_offset = node.end_col_offset = 0
+        return node
+
+
+class PythonInterpreter(Interpreter):
+    """
+    An Interpreter which evaluates expressions by compiling them to native
+    Python functions.
+    """
+    def evaluate(self, expr: Expr) -> Any:
+        try:
+            function = PythonCompiler(self).compile(expr)
+        except RecursionError:
+            # CPython's compiler has a nesting limit of its own, lower than
+            # the interpreter's; very deep trees are walked instead, with an
+            # explicit stack, as they may be too deep to walk recursively.
+            return IterativeInterpreter(self.environment).value(expr)
+        return function()
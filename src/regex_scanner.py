@@ -0,0 +1,112 @@
+import re
+from typing import Iterator
+from .error import error
+from .numeric import parse_number
+from .scanner import Scanner
+from .tokens import Token, TokenType
+
+
+class RegexScanner(Scanner):
+    """
+    A drop-in replacement for Scanner which consumes a whole lexeme per step
+    with one compiled master pattern, instead of dispatching on every single
+    character. It produces the same tokens and reports the same errors.
+    """
+    PATTERN = re.compile(
+        r"(?P<whitespace>\s+)"
+        r"|(?P<comment>//[^\n]*)"
+        r"|(?P<multiline_comment>/\*.*?(?:\*/|\Z))"
+        r"|(?P<number>[0-9]+(?:\.[0-9]+)?)"
+        # Identifiers start with a letter and continue with letters or digits;
+        # the start is re-checked with str.isalpha() to match Scanner exactly.
+        r"|(?P<identifier>[^\W\d_][^\W_]*)"
+        r'|(?P<string>"[^"]*"?)'
+        r"|(?P<operator>[!=<>]=?|[-+*/(){},.;])"
+        r"|(?P<unexpected>.)",
+        re.DOTALL
+    )
+
+    OPERATORS = {
+        "(": TokenType.LEFT_PAREN,
+        ")": TokenType.RIGHT_PAREN,
+        "{": TokenType.LEFT_BRACE,
+        "}": TokenType.RIGHT_BRACE,
+        ",": TokenType.COMMA,
+        ".": TokenType.DOT,
+        "-": TokenType.MINUS,
+        "+": TokenType.PLUS,
+        ";": TokenType.SEMICOLON,
+        "/": TokenType.SLASH,
+        "*": TokenType.STAR,
+        "!": TokenType.BANG,
+        "!=": TokenType.BANG_EQUAL,
+        "=": TokenType.EQUAL,
+        "==": TokenType.EQUAL_EQUAL,
+        "<": TokenType.LESS,
+        "<=": TokenType.LESS_EQUAL,
+        ">": TokenType.GREATER,
+        ">=": TokenType.GREATER_EQUAL,
+    }
+
+    def scan_tokens(self) -> list[Token]:
+        self.tokens.extend(self.lex(self.source))
+        self.tokens.append(Token(TokenType.EOF, "", None, self.line))
+        return self.tokens
+
+    def lex(self, source: str, partial: bool = False) -> Iterator[Token]:
+        """
+        Yield the tokens of source from self.current onwards. If partial is
+        set, source is only a prefix of the input, so a lexeme running into its
+        end is left unconsumed (at self.current), as more input may extend it.
+        """
+        # Everything used in the loop is bound locally, as attribute lookups
+        # are a large part of the per-lexeme cost.
+        length = len(source)
+        horizon = length - 1
+        finditer = self.PATTERN.finditer
+        keywords = Scanner.KEYWORDS
+        operators = self.OPERATORS
+        line = self.line
+        current = self.current
+
+        while current < length:
+            for m in finditer(source, current):
+                kind = m.lastgroup
+                text = m.group()
+
+                if partial and m.end() >= horizon and kind != "whitespace" and kind != "unexpected":
+                    # "12" may yet become "12.5", "/" become "//", and so on.
+                    end = m.end()
+                    if end == length or (kind == "number" and source[end] == "."):
+                        self.start = self.current = m.start()
+                        self.line = line
+                        return
+
+                if kind == "whitespace" or kind == "multiline_comment":
+                    line += text.count("\n")
+                elif kind == "operator":
+                    yield Token(operators[text], text, None, line)
+                elif kind == "number":
+                    yield Token(TokenType.NUMBER, text, parse_number(text), line)
+                elif kind == "identifier":
+                    if not text[0].isalpha():
+                        # A digit-like character such as "²" is a word character
+                        # but cannot start an identifier; report it and resume
+                        # scanning right after it.
+                        error(line, "Unexpected character.")
+                        current = m.start() + 1
+                        break
+                    yield Token(keywords.get(text, TokenType.IDENTIFIER), text, None, line)
+                elif kind == "string":
+                    line += text.count("\n")
+                    if len(text) > 1 and text[-1] == '"':
+                        yield Token(TokenType.STRING, text, text[1:-1], line)
+                    else:
+                        error(line, "Unterminated string.")
+                elif kind == "unexpected":
+                    error(line, "Unexpected character.")
+            else:
+                current = length
+
+        self.start = self.current = current
+        self.line = line
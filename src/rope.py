@@ -0,0 +1,65 @@
+"""
+Strings built by `+` are held as ropes: the two strings concatenated,
+without copying either. Otherwise a chain of n concatenations copies the
+string built so far at every step, taking time quadratic in its length.
+A rope is flattened into a str, once, when anything looks at its text.
+Ropes only ever exist inside the Interpreter: everything it prints,
+compares or returns to its callers is flattened first.
+"""
+from typing import Any, Union
+
+# Concatenations no longer than this are cheaper to copy than to defer.
+SHORT = 256
+
+
+class Rope:
+    __slots__ = ("left", "right", "length", "text")
+
+    def __init__(self, left: "Text", right: "Text") -> None:
+        self.left = left
+        self.right = right
+        self.length = len(left) + len(right)
+        # The flattened text, once it has been asked for.
+        self.text = None
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __str__(self) -> str:
+        if self.text is None:
+            # Ropes built by long chains are deep, so they are walked with an
+            # explicit stack.
+            pieces: list[str] = []
+            pending: list[Text] = [self]
+            while pending:
+                node = pending.pop()
+                if type(node) is str:
+                    pieces.append(node)
+                elif node.text is not None:
+                    pieces.append(node.text)
+                else:
+                    pending += (node.right, node.left)
+            self.text = "".join(pieces)
+            # Only the text is needed from now on.
+            self.left = self.right = None
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"Rope({str(self)!r})"
+
+
+Text = Union[str, Rope]
+
+
+def concatenate(left: Text, right: Text) -> Text:
+    if len(left) + len(right) <= SHORT:
+        # Both are short, so neither is a rope.
+        return left + right
+    return Rope(left, right)
+
+
+def flatten(value: Any) -> Any:
+    """
+    The value with any rope flattened into a str.
+    """
+    return str(value) if type(value) is Rope else value
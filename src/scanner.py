@@ -1,5 +1,6 @@
 from typing import Any, Optional
 from .error import error
+from .numeric import parse_number
 from .tokens import Token, TokenType
 
 
@@ -154,7 +155,7 @@ class Scanner:
         
         while self.is_decimal_digit(self.peek()): self.advance()
         
-        self.add_token(TokenType.NUMBER, float(self.source[self.start:self.current]))
+        self.add_token(TokenType.NUMBER, parse_number(self.source[self.start:self.current]))
 
     def identifier(self) -> None:
         while self.peek().isalnum(): self.advance()
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from .embed import evaluate
+from .error import LoxSyntaxError, RuntimeException
+from .interpreter import Interpreter
+
+# A request line longer than this is refused, rather than buffered forever.
+MAX_REQUEST_SIZE = 1 << 24
+
+
+def evaluate_request(source: str, variables: Optional[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Evaluate one request's source in a pool worker, returning the body of the
+    response. Each worker keeps its own compile cache, so sources that are
+    sent repeatedly are only scanned and parsed once per worker.
+    """
+    problem = check_variables(variables or {})
+    if problem is not None:
+        return {"ok": False, "error": {"kind": "request", "message": problem}}
+
+    try:
+        value = evaluate(source, variables)
+    except LoxSyntaxError as e:
+        return {
+            "ok": False,
+            "error": {
+                "kind": "syntax",
+                "message": str(e),
+                "errors": [{"line": line, "message": message} for line, message in e.errors],
+            },
+        }
+    except RuntimeException as e:
+        return {"ok": False, "error": {"kind": "runtime", "message": e.message, "line": e.token.line}}
+
+    # JSON has no infinities or NaN; those values are only sent as text.
+    finite = not (type(value) is float and not math.isfinite(value))
+    return {"ok": True, "value": value if finite else None, "text": Interpreter().stringify(value)}
+
+
+def check_variables(variables: dict[str, Any]) -> Optional[str]:
+    """
+    Why the values of variables cannot be Lox values, or None if they can.
+    """
+    for name, value in variables.items():
+        if type(value) is int or type(value) is float:
+            # Lox numbers are floats, which huge ints do not fit in.
+            try:
+                finite = math.isfinite(value)
+            except OverflowError:
+                finite = False
+            if not finite:
+                return f"Variable \"{name}\" is out of range for a number."
+        elif value is not None and type(value) is not bool and type(value) is not str:
+            return f"Variable \"{name}\" must be a number, string, boolean or null."
+    return None
+
+
+@dataclass
+class Metrics:
+    """
+    Request counts and the latencies of the most recent requests, from
+    which a response to a {"command": "metrics"} request is made.
+    """
+    window: int = 10000
+    started: float = field(default_factory=time.monotonic)
+    requests: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    latencies: deque = field(default_factory=deque)
+
+    def record(self, latency: float, ok: bool, timed_out: bool = False) -> None:
+        self.requests += 1
+        self.failures += not ok
+        self.timeouts += timed_out
+        self.latencies.append(latency)
+        if len(self.latencies) > self.window:
+            self.latencies.popleft()
+
+    def percentile(self, latencies: list[float], fraction: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def snapshot(self) -> dict[str, Any]:
+        uptime = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "uptime": uptime,
+            "requests_per_second": self.requests / uptime if uptime > 0 else 0.0,
+            # In milliseconds, over the last `window` requests.
+            "latency_ms": {
+                name: self.percentile(latencies, fraction) * 1000
+                for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+            },
+        }
+
+
+class EvaluationServer:
+    """
+    Serves newline-delimited JSON requests of the form
+    {"id": ..., "source": "1 + x", "variables": {"x": 2}}, answering each
+    with one line holding the same id and either the value or the error.
+
+    Requests are evaluated in a bounded pool of worker processes, so a long
+    evaluation never stalls the event loop or other connections. A client
+    may pipeline any number of requests on one connection; they are
+    evaluated concurrently and answered in the order they were sent.
+
+    The timeout runs from when a request is read, so it also covers any
+    time spent waiting for a free worker.
+    """
+    def __init__(self, workers: Optional[int] = None, timeout: Optional[float] = 10.0, max_pending: Optional[int] = None, executor: Optional[Executor] = None) -> None:
+        workers = workers or os.cpu_count() or 1
+        self.executor = executor or ProcessPoolExecutor(workers)
+        self.timeout = timeout
+        # Reading stops once this many requests are waiting on or running in
+        # the pool, so a fast client cannot queue up unbounded work.
+        self.pending = asyncio.Semaphore(max_pending or workers * 4)
+        self.metrics = Metrics()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        responses: asyncio.Queue = asyncio.Queue()
+        sender = asyncio.create_task(self.send_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The line was longer than the reader's limit.
+                    await responses.put(self.completed(self.request_error(None, "Request is too large.")))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                await self.pending.acquire()
+                await responses.put(asyncio.create_task(self.handle_request(line)))
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+
+    async def send_responses(self, responses: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        while (task := await responses.get()) is not None:
+            response = await task
+            try:
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                # The client has gone, but the remaining tasks must still be
+                # awaited so their results are not left unretrieved.
+                pass
+
+    def completed(self, response: dict[str, Any]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(response)
+        return future
+
+    def request_error(self, request_id: Any, message: str) -> dict[str, Any]:
+        return {"id": request_id, "ok": False, "error": {"kind": "request", "message": message}}
+
+    async def handle_request(self, line: bytes) -> dict[str, Any]:
+        """
+        Answer one request line, for which a slot of self.pending has been
+        acquired.
+        """
+        started = time.monotonic()
+        job: Optional[Future] = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                return self.request_error(None, f"Invalid JSON: {e}.")
+            if not isinstance(request, dict):
+                return self.request_error(None, "A request must be a JSON object.")
+
+            request_id = request.get("id")
+            if request.get("command") == "metrics":
+                return {"id": request_id, "ok": True, "metrics": self.metrics.snapshot()}
+
+            source = request.get("source")
+            variables = request.get("variables")
+            if not isinstance(source, str):
+                return self.request_error(request_id, "A request must have a \"source\" string.")
+            if variables is not None and not isinstance(variables, dict):
+                return self.request_error(request_id, "\"variables\" must be an object.")
+
+            loop = asyncio.get_running_loop()
+            try:
+                job = self.executor.submit(evaluate_request, source, variables)
+                # Only once the pool is done with the request is its slot
+                # free: a worker goes on with a request that timed out until
+                # it finishes.
+                job.add_done_callback(lambda _: loop.call_soon_threadsafe(self.pending.release))
+                response = await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+            except asyncio.TimeoutError:
+                # The worker cannot be interrupted and finishes the evaluation
+                # regardless; only its result is discarded. A request still
+                # waiting for a worker is cancelled.
+                self.metrics.record(time.monotonic() - started, False, timed_out=True)
+                return {"id": request_id, "ok": False, "error": {"kind": "timeout", "message": f"Evaluation took longer than {self.timeout} seconds."}}
+            except Exception as e:
+                # Such as the pool breaking because a worker was killed.
+                self.metrics.record(time.monotonic() - started, False)
+                return {"id": request_id, "ok": False, "error": {"kind": "internal", "message": repr(e)}}
+
+            self.metrics.record(time.monotonic() - started, response["ok"])
+            return {"id": request_id, **response}
+        finally:
+            # Unless a worker was given the request, it needs its slot no longer.
+            if job is None:
+                self.pending.release()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 7878, path: Optional[str] = None) -> None:
+        """
+        Serve on a Unix socket at path if one is given, else on host:port,
+        until cancelled.
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path, limit=MAX_REQUEST_SIZE)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_REQUEST_SIZE)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
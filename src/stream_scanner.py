@@ -0,0 +1,67 @@
+from typing import Iterable, Iterator
+from .regex_scanner import RegexScanner
+from .tokens import Token, TokenType
+
+
+class StreamScanner(RegexScanner):
+    """
+    A push-based scanner, which is fed the source a chunk at a time instead of
+    all at once. Only the unfinished lexeme at the end of the latest chunk is
+    kept around, so memory stays proportional to the longest lexeme rather
+    than to the size of the whole input.
+    """
+    def __init__(self) -> None:
+        super().__init__("")
+        self.closed = False
+
+    def feed(self, chunk: str) -> list[Token]:
+        """
+        Add the next chunk of source, returning every token it completes.
+        """
+        if self.closed:
+            raise ValueError("Cannot feed a closed StreamScanner.")
+
+        self.source = self.source[self.current:] + chunk
+        self.start = self.current = 0
+        tokens = list(self.lex(self.source, partial=True))
+        self.compact()
+        return tokens
+
+    def close(self) -> list[Token]:
+        """
+        Mark the end of the input, returning the remaining tokens and EOF.
+        """
+        if self.closed:
+            return []
+
+        self.closed = True
+        tokens = list(self.lex(self.source))
+        tokens.append(Token(TokenType.EOF, "", None, self.line))
+        self.source = ""
+        self.start = self.current = 0
+        return tokens
+
+    def compact(self) -> None:
+        # A comment can be arbitrarily long, but nothing in it is needed to
+        # finish scanning it; keep its opening (and a possible closing "*")
+        # so it is not rescanned in full on every chunk.
+        pending = self.source[self.current:]
+        if len(pending) <= 3:
+            return
+
+        if pending.startswith("//"):
+            self.source = "//"
+        elif pending.startswith("/*") and not pending.endswith("*/"):
+            self.line += pending.count("\n")
+            self.source = "/**" if pending.endswith("*") else "/*"
+        else:
+            return
+        self.start = self.current = 0
+
+    def scan_chunks(self, chunks: Iterable[str]) -> Iterator[Token]:
+        """
+        Lazily yield the tokens of a sequence of source chunks, ending in EOF.
+        """
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.close()
@@ -0,0 +1,143 @@
+from array import array
+from sys import intern
+from typing import Any, Iterator, Sequence
+from .error import error
+from .numeric import parse_number
+from .regex_scanner import RegexScanner
+from .scanner import Scanner
+from .tokens import Token, TokenType
+
+# Token types are stored as their position in this tuple.
+TOKEN_TYPES: tuple[TokenType, ...] = tuple(TokenType)
+TYPE_CODES: dict[TokenType, int] = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+NO_LITERAL = -1
+
+
+class TokenBuffer(Sequence[Token]):
+    """
+    A compact, column-oriented store of the tokens of one source string.
+    Each token costs a handful of bytes spread over typed arrays, rather than
+    a whole Token object; lexemes are only sliced out of the source when a
+    Token is actually asked for. Iterating materialises one Token at a time,
+    so a Parser pulling from the buffer only ever holds its lookahead.
+    """
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.types = array("B")
+        self.starts = array("q")
+        self.lengths = array("i")
+        self.lines = array("i")
+        self.literal_indices = array("i")
+        # Literal values are pooled, so that repeated numbers and strings
+        # are stored (and interned) once.
+        self.literals: list[Any] = []
+        self.literal_pool: dict[Any, int] = {}
+
+    def append(self, token_type: TokenType, start: int, length: int, line: int, literal: Any = None) -> None:
+        self.types.append(TYPE_CODES[token_type])
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.lines.append(line)
+        if literal is None:
+            self.literal_indices.append(NO_LITERAL)
+        else:
+            self.literal_indices.append(self.add_literal(literal))
+
+    def add_literal(self, literal: Any) -> int:
+        # Keyed by type too, so that e.g. the string "1" and the number 1.0
+        # never share a slot.
+        key = (type(literal), literal)
+        index = self.literal_pool.get(key)
+        if index is None:
+            index = len(self.literals)
+            self.literals.append(intern(literal) if isinstance(literal, str) else literal)
+            self.literal_pool[key] = index
+        return index
+
+    def token_type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def lexeme(self, index: int) -> str:
+        start = self.starts[index]
+        return intern(self.source[start:start + self.lengths[index]])
+
+    def literal(self, index: int) -> Any:
+        literal_index = self.literal_indices[index]
+        return None if literal_index == NO_LITERAL else self.literals[literal_index]
+
+    def line(self, index: int) -> int:
+        return self.lines[index]
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TokenBuffer index out of range")
+        return Token(self.token_type(index), self.lexeme(index), self.literal(index), self.lines[index])
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def nbytes(self) -> int:
+        """
+        The number of bytes used by the columns, not counting the literal pool.
+        """
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.types, self.starts, self.lengths, self.lines, self.literal_indices)
+        )
+
+
+class BufferScanner(RegexScanner):
+    """
+    A RegexScanner which writes its tokens straight into a TokenBuffer,
+    never creating a Token object.
+    """
+    def scan_tokens(self) -> TokenBuffer:
+        source = self.source
+        length = len(source)
+        buffer = TokenBuffer(source)
+        append = buffer.append
+        finditer = self.PATTERN.finditer
+        keywords = Scanner.KEYWORDS
+        operators = self.OPERATORS
+        line = self.line
+        current = self.current
+
+        while current < length:
+            for m in finditer(source, current):
+                kind = m.lastgroup
+                start, end = m.span()
+
+                if kind == "whitespace" or kind == "multiline_comment":
+                    line += source.count("\n", start, end)
+                elif kind == "operator":
+                    append(operators[m.group()], start, end - start, line)
+                elif kind == "number":
+                    append(TokenType.NUMBER, start, end - start, line, parse_number(m.group()))
+                elif kind == "identifier":
+                    if not source[start].isalpha():
+                        # See RegexScanner.lex.
+                        error(line, "Unexpected character.")
+                        current = start + 1
+                        break
+                    append(keywords.get(m.group(), TokenType.IDENTIFIER), start, end - start, line)
+                elif kind == "string":
+                    line += source.count("\n", start, end)
+                    if end - start > 1 and source[end - 1] == '"':
+                        append(TokenType.STRING, start, end - start, line, source[start + 1:end - 1])
+                    else:
+                        error(line, "Unterminated string.")
+                elif kind == "unexpected":
+                    error(line, "Unexpected character.")
+            else:
+                current = length
+
+        self.start = self.current = current
+        self.line = line
+        append(TokenType.EOF, length, 0, line)
+        return buffer
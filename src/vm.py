@@ -0,0 +1,146 @@
+from typing import Any
+
+from .chunk import Chunk, OpCode
+from .compiler import Compiler
+from .error import RuntimeException
+from .expr import Expr
+from .interpreter import Interpreter
+from .tokens import Token, TokenType
+
+
+class VM(Interpreter):
+    """
+    A stack-based virtual machine, which evaluates expressions by compiling
+    them to bytecode and running it in a single dispatch loop. It shares the
+    rest of its behaviour (printing, error reporting) with Interpreter, and
+    produces identical results.
+    """
+    # Used to rebuild the operator token of a failing instruction, which is
+    # all RuntimeException needs for its report.
+    OPERATORS = {
+        OpCode.ADD: (TokenType.PLUS, "+"),
+        OpCode.SUBTRACT: (TokenType.MINUS, "-"),
+        OpCode.MULTIPLY: (TokenType.STAR, "*"),
+        OpCode.DIVIDE: (TokenType.SLASH, "/"),
+        OpCode.EQUAL: (TokenType.EQUAL_EQUAL, "=="),
+        OpCode.NOT_EQUAL: (TokenType.BANG_EQUAL, "!="),
+        OpCode.GREATER: (TokenType.GREATER, ">"),
+        OpCode.GREATER_EQUAL: (TokenType.GREATER_EQUAL, ">="),
+        OpCode.LESS: (TokenType.LESS, "<"),
+        OpCode.LESS_EQUAL: (TokenType.LESS_EQUAL, "<="),
+        OpCode.NEGATE: (TokenType.MINUS, "-"),
+        OpCode.NOT: (TokenType.BANG, "!"),
+    }
+
+    def evaluate(self, expr: Expr) -> Any:
+        return self.run(Compiler().compile(expr))
+
+    def run(self, chunk: Chunk) -> Any:
+        code = chunk.code
+        constants = chunk.constants
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        stringify = self.stringify
+
+        # Opcodes are bound as plain ints, which compare faster than members.
+        CONSTANT, CONSTANT_LONG = int(OpCode.CONSTANT), int(OpCode.CONSTANT_LONG)
+        NIL, TRUE, FALSE = int(OpCode.NIL), int(OpCode.TRUE), int(OpCode.FALSE)
+        GET_VARIABLE, GET_VARIABLE_LONG = int(OpCode.GET_VARIABLE), int(OpCode.GET_VARIABLE_LONG)
+        EQUAL, NOT_EQUAL = int(OpCode.EQUAL), int(OpCode.NOT_EQUAL)
+        GREATER, GREATER_EQUAL = int(OpCode.GREATER), int(OpCode.GREATER_EQUAL)
+        LESS, LESS_EQUAL = int(OpCode.LESS), int(OpCode.LESS_EQUAL)
+        ADD, SUBTRACT = int(OpCode.ADD), int(OpCode.SUBTRACT)
+        MULTIPLY, DIVIDE = int(OpCode.MULTIPLY), int(OpCode.DIVIDE)
+        NOT, NEGATE, RETURN = int(OpCode.NOT), int(OpCode.NEGATE), int(OpCode.RETURN)
+
+        ip = 0
+        while True:
+            instruction = code[ip]
+            ip += 1
+
+            if instruction == CONSTANT:
+                push(constants[code[ip]])
+                ip += 1
+            elif instruction == GET_VARIABLE:
+                push(self.look_up(constants[code[ip]]))
+                ip += 1
+            elif instruction == NIL:
+                push(None)
+            elif instruction == TRUE:
+                push(True)
+            elif instruction == FALSE:
+                push(False)
+            elif instruction == NOT:
+                value = pop()
+                push(value is False or value is None)
+            elif instruction == NEGATE:
+                value = pop()
+                if type(value) is not float:
+                    raise self.error(chunk, ip - 1, "Operand must be a number.")
+                push(-value)
+            elif instruction == RETURN:
+                return pop()
+            elif instruction == CONSTANT_LONG:
+                push(constants[(code[ip] << 16) | (code[ip + 1] << 8) | code[ip + 2]])
+                ip += 3
+            elif instruction == GET_VARIABLE_LONG:
+                push(self.look_up(constants[(code[ip] << 16) | (code[ip + 1] << 8) | code[ip + 2]]))
+                ip += 3
+            else:
+                # Every other instruction is a binary operator.
+                right = pop()
+                left = pop()
+                left_type = type(left)
+                right_type = type(right)
+
+                if instruction == ADD:
+                    if left_type is float and right_type is float:
+                        push(left + right)
+                    elif left_type in (float, str) and right_type in (float, str):
+                        push(stringify(left) + stringify(right))
+                    else:
+                        raise self.error(chunk, ip - 1, "Operators must both be floats or strings.")
+                elif instruction <= LESS_EQUAL:
+                    # Comparisons, which turn both operands into strings if
+                    # either one is a string.
+                    if left_type is str or right_type is str:
+                        left, right = str(left), str(right)
+                    elif instruction >= GREATER and not (left_type is float and right_type is float):
+                        raise self.comparison_error(chunk, ip - 1, left, right)
+
+                    if instruction == EQUAL:
+                        push(right is None if left is None else left == right)
+                    elif instruction == NOT_EQUAL:
+                        push(right is not None if left is None else not left == right)
+                    elif instruction == GREATER:
+                        push(left > right)
+                    elif instruction == GREATER_EQUAL:
+                        push(left >= right)
+                    elif instruction == LESS:
+                        push(left < right)
+                    else:
+                        push(left <= right)
+                else:
+                    if left_type is not float or right_type is not float:
+                        raise self.error(chunk, ip - 1, "Operands must be numbers.")
+
+                    if instruction == SUBTRACT:
+                        push(left - right)
+                    elif instruction == MULTIPLY:
+                        push(left * right)
+                    else:
+                        if right == 0:
+                            raise self.error(chunk, ip - 1, "Division by zero error")
+                        push(left / right)
+
+    def error(self, chunk: Chunk, offset: int, message: str) -> RuntimeException:
+        token_type, lexeme = self.OPERATORS[chunk.code[offset]]
+        return RuntimeException(message, Token(token_type, lexeme, None, chunk.lines[offset]))
+
+    def comparison_error(self, chunk: Chunk, offset: int, left: Any, right: Any) -> RuntimeException:
+        _, lexeme = self.OPERATORS[chunk.code[offset]]
+        return self.error(
+            chunk, offset,
+            f"Comparison {lexeme} of {left} of type {type(left)} is not possible with {right} of type {type(right)}."
+        )
@@ -0,0 +1,40 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.batch import evaluate_batch
+from src.interpreter import Interpreter
+from src.parser import Parser
+from src.scanner import Scanner
+
+
+def parse(source):
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def test_booleans_among_numbers_stay_booleans():
+    result = evaluate_batch(parse("-a"), {"a": [1, 2.5, True]})
+
+    assert list(result.values[:2]) == [-1, -2.5]
+    assert result.error(0) is None and result.error(1) is None
+    assert result.error(2).message == "Operand must be a number."
+
+
+def test_numbers_among_strings_stay_numbers():
+    values = [1, "s", True]
+    result = evaluate_batch(parse("a == 1"), {"a": values})
+
+    assert result.values[0] and not result.values[1]
+    # Each row is as the interpreter evaluates it alone.
+    assert list(result.values) == [Interpreter({"a": value}).evaluate(parse("a == 1")) for value in values]
+    assert result.ok.all()
+
+
+def test_uniform_columns_are_narrowed():
+    result = evaluate_batch(parse("a + b"), {"a": [1, 2.5], "b": [np.float64(1), 2]})
+    assert result.values.dtype == np.float64
+    assert list(result.values) == [2.0, 4.5]
+
+    result = evaluate_batch(parse("!a"), {"a": [True, False]})
+    assert result.values.dtype == bool
+    assert list(result.values) == [False, True]
@@ -0,0 +1,39 @@
+import traceback
+
+import pytest
+
+from src.embed import Evaluator
+from src.error import LoxSyntaxError
+
+
+def test_cached_syntax_error_traceback_does_not_grow():
+    evaluator = Evaluator()
+    depths = []
+    for _ in range(100):
+        with pytest.raises(LoxSyntaxError) as raised:
+            evaluator.compile("1 +")
+        depths.append(len(traceback.extract_tb(raised.value.__traceback__)))
+
+    assert evaluator.stats.hits == 99
+    assert len(set(depths)) == 1
+
+
+def test_cached_syntax_error_keeps_its_errors():
+    evaluator = Evaluator()
+    with pytest.raises(LoxSyntaxError) as first:
+        evaluator.compile("(1")
+    with pytest.raises(LoxSyntaxError) as second:
+        evaluator.compile("(1")
+
+    assert first.value is not second.value
+    assert first.value.errors == second.value.errors
+    assert str(first.value) == str(second.value)
+
+
+def test_deep_sources_are_evaluated():
+    evaluator = Evaluator()
+
+    assert evaluator.evaluate(" + ".join(["x"] * 5000), {"x": 2}) == 10000.0
+    assert evaluator.evaluate("(" * 5000 + "1" + ")" * 5000) == 1.0
+    with pytest.raises(LoxSyntaxError):
+        evaluator.compile("(" * 5000 + "1")
@@ -0,0 +1,26 @@
+from src.hashcons import Interner, MemoizingInterpreter, count_unique_nodes
+from src.iterative import IterativeParser
+from src.scanner import Scanner
+
+
+def parse(source):
+    return IterativeParser(Scanner(source).scan_tokens()).parse()
+
+
+def test_deep_tree_is_interned_and_evaluated():
+    # Every term is the same, so only the chain itself is not shared.
+    source = " + ".join(["(x * 2)"] * 5000)
+    interner = Interner()
+
+    expression = interner.intern(parse(source))
+
+    assert count_unique_nodes(expression) == 5000 + 3
+    assert MemoizingInterpreter(interner.shared, {"x": 3}).evaluate(expression) == 30000
+
+
+def test_deeply_nested_groupings_are_evaluated():
+    interner = Interner()
+
+    expression = interner.intern(parse("(" * 5000 + "-x" + ")" * 5000))
+
+    assert MemoizingInterpreter(interner.shared, {"x": 3}).evaluate(expression) == -3
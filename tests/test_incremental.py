@@ -0,0 +1,37 @@
+from src.incremental import Document
+from src.parser import Parser
+
+
+def test_unparsable_edit_in_long_chain_falls_back_promptly(monkeypatch):
+    terms = 2000
+    document = Document(" + ".join(["1"] * terms))
+
+    calls = 0
+    parse_precedence = Parser.parse_precedence
+
+    def counting(self, precedence):
+        nonlocal calls
+        calls += 1
+        return parse_precedence(self, precedence)
+
+    monkeypatch.setattr(Parser, "parse_precedence", counting)
+
+    # An unclosed parenthesis before the first term leaves no subtree which
+    # parses again on its own.
+    result = document.edit(0, 1, "(")
+
+    assert result.full_reparse
+    assert document.errors
+    # A full parse calls parse_precedence once a term; trying every
+    # enclosing subtree would call it about terms ** 2 / 4 times.
+    assert calls < 2 * terms
+
+
+def test_edit_in_long_chain_reparses_only_the_term():
+    document = Document(" + ".join(["1"] * 2000))
+
+    result = document.edit(0, 1, "2")
+
+    assert not result.full_reparse
+    assert result.reparsed == 1
+    assert not document.errors
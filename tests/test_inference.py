@@ -0,0 +1,23 @@
+import io
+
+from src.error import run_context
+from src.inference import TypedInterpreter
+from src.iterative import IterativeParser
+from src.scanner import Scanner
+
+
+def run(source, environment=None):
+    expression = IterativeParser(Scanner(source).scan_tokens()).parse()
+    with run_context(io.StringIO()) as context:
+        TypedInterpreter(environment).interpret(expression)
+        return context.out.getvalue()
+
+
+def test_deep_trees_are_evaluated():
+    assert run(" + ".join(["1"] * 20000)) == "20000\n"
+    assert run("(" * 5000 + "-x" + ")" * 5000, {"x": 2}) == "-2\n"
+    assert run('"a" + ' * 5000 + '"b"') == "a" * 5000 + "b\n"
+
+
+def test_deep_tree_reports_runtime_errors():
+    assert run(" + ".join(["1"] * 5000) + ' - "a"') == "Operands must be numbers. [Line 1]\n"
@@ -0,0 +1,20 @@
+import pytest
+
+from benchmarks.stress import SHAPES
+from src.error import collect_errors
+from src.iterative import IterativeInterpreter, IterativeParser
+from src.scanner import Scanner
+
+DEPTH = 100000
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_extremely_deep_expressions(shape):
+    source, expected = SHAPES[shape](DEPTH)
+
+    with collect_errors() as errors:
+        expression = IterativeParser(Scanner(source).scan_tokens()).parse()
+    assert not errors
+
+    interpreter = IterativeInterpreter()
+    assert interpreter.stringify(interpreter.evaluate(expression)) == expected
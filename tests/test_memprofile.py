@@ -0,0 +1,14 @@
+from src import memprofile
+
+
+def test_stage_counts_only_its_own_objects():
+    memprofile.start()
+    profile = memprofile.MemoryProfile()
+
+    with profile.stage("nothing"):
+        pass
+    with profile.stage("lists"):
+        kept = [[] for _ in range(10)]
+
+    assert profile.stages[0].objects == {}
+    assert profile.stages[1].objects == {"list": len(kept) + 1}
@@ -0,0 +1,30 @@
+from src.expr import Literal
+from src.iterative import IterativeInterpreter, IterativeParser
+from src.optimizer import Optimizer
+from src.scanner import Scanner
+
+
+def parse(source):
+    return IterativeParser(Scanner(source).scan_tokens()).parse()
+
+
+def test_deeply_nested_groupings_are_removed():
+    optimizer = Optimizer()
+
+    expression = optimizer.optimize(parse("(" * 3000 + "x" + ")" * 3000))
+
+    assert IterativeInterpreter({"x": 1}).evaluate(expression) == 1
+    assert optimizer.stats.groupings_removed == 3000
+
+
+def test_long_chain_of_literals_is_folded():
+    expression = Optimizer().optimize(parse(" + ".join(["1"] * 5000)))
+
+    assert isinstance(expression, Literal)
+    assert expression.value == 5000
+
+
+def test_long_chain_with_a_variable_is_kept():
+    expression = Optimizer().optimize(parse(" + ".join(["x"] + ["1"] * 5000)))
+
+    assert IterativeInterpreter({"x": 2}).evaluate(expression) == 5002
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from src.error import collect_errors
+from src.regex_scanner import RegexScanner
+from src.scanner import Scanner
+
+
+def scan(scanner_class, source):
+    with collect_errors() as errors:
+        tokens = scanner_class(source).scan_tokens()
+    return [(token.token_type, token.lexeme, token.literal, token.line) for token in tokens], list(errors)
+
+
+SOURCES = [
+    "",
+    "1 + 2.5 * (3 - 4) / 5",
+    '"a" + "multi\nline" + nil',
+    "!true != false == (x <= y) >= z < w > v",
+    "12. .5 007 1.25e3",
+    "// a comment\n1 /* a block\ncomment */ + 2",
+    "and class else fun for if or print return super this var while",
+    '"unterminated',
+    '1 + "unterminated\nacross lines',
+    "1 @ 2 # 3",
+    "x = 1; y ^ 2",
+    "/* unterminated block",
+    "é + ½ + ٣",
+]
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_matches_scanner(source):
+    assert scan(RegexScanner, source) == scan(Scanner, source)
+
+
+def test_matches_scanner_on_random_sources():
+    alphabet = list('()[]{},.-+;*/!=<>"\n \t\r_abcXYZ019²½٣éß@#') + ["//", "/*", "*/", "and", "nil", "1.5", "12.", ".5"]
+    generator = random.Random(1)
+    for _ in range(3000):
+        source = "".join(generator.choice(alphabet) for _ in range(generator.randrange(40)))
+        assert scan(RegexScanner, source) == scan(Scanner, source), source
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src import server
+from src.server import EvaluationServer
+
+
+def test_timed_out_request_keeps_its_slot_until_the_worker_is_done(monkeypatch):
+    finished = threading.Event()
+
+    def slow(source, variables):
+        finished.wait(5)
+        return {"ok": True, "value": 1.0, "text": "1"}
+
+    monkeypatch.setattr(server, "evaluate_request", slow)
+
+    async def run():
+        evaluator = EvaluationServer(timeout=0.05, max_pending=1, executor=ThreadPoolExecutor(1))
+        await evaluator.pending.acquire()
+        response = await evaluator.handle_request(b'{"id": 1, "source": "1"}')
+        assert response["error"]["kind"] == "timeout"
+        # The worker is still busy with the request.
+        assert evaluator.pending.locked()
+
+        finished.set()
+        await asyncio.wait_for(evaluator.pending.acquire(), 1)
+        evaluator.executor.shutdown()
+
+    asyncio.run(run())
+
+
+def test_invalid_request_releases_its_slot():
+    async def run():
+        evaluator = EvaluationServer(max_pending=1, executor=ThreadPoolExecutor(1))
+        await evaluator.pending.acquire()
+        response = await evaluator.handle_request(b"[1, 2]")
+        assert response["error"]["kind"] == "request"
+        assert not evaluator.pending.locked()
+        evaluator.executor.shutdown()
+
+    asyncio.run(run())
+
+
+def test_variables_out_of_range_are_request_errors():
+    for value in (10 ** 400, float("inf"), [1], {"a": 1}):
+        response = server.evaluate_request("x", {"x": value})
+        assert response["error"]["kind"] == "request"
+
+    assert server.evaluate_request("x + 1", {"x": 10 ** 15})["value"] == 10 ** 15 + 1
+    assert server.evaluate_request("x", {"x": None})["text"] == "nil"